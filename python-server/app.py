@@ -1,23 +1,62 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, model_validator
 import uvicorn
+import anyio
 import base64
 import io
 from PIL import Image
 import numpy as np
+import trimesh
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union, BinaryIO
 import logging
 import time
+import asyncio
+import functools
+import hashlib
+import threading
+import itertools
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # カスタムモジュール
 from config import config, Config
-from face_mesh import FaceMeshProcessor
+from face_mesh import FaceMeshProcessor, landmarks_to_array
 from mesh_editor import MeshEditor
 from nano_banana import NanoBananaProcessor
 from instruction_parser import InstructionParser
+from mesh_cache import MeshCache
+from pipeline import FaceMeshPipeline
+
+# libjpeg-turbo（SIMD）による高速JPEGデコード（未インストール時はPILにフォールバック）
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    turbo_jpeg: Optional[TurboJPEG] = TurboJPEG()
+except Exception:
+    turbo_jpeg = None
+
+# MessagePack（Accept: application/msgpack 指定時のバイナリ応答。未インストール時はJSONのみ）
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Brotli圧縮（未インストール時はgzipのみ）
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+# SIMD版base64（未インストール時は標準ライブラリ）
+try:
+    from pybase64 import b64encode
+except ImportError:
+    from base64 import b64encode
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
@@ -29,9 +68,14 @@ app = FastAPI(
     version=config.get("version", "0.1.0"),
     description="美容整形シミュレーションMVP - 複数部位対応",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # 既定のレスポンスをorjsonでシリアライズ（numpy配列・スカラーもそのまま扱える）
+    default_response_class=ORJSONResponse
 )
 
+# startupでプロセッサーの生成・ウォームアップが終わるとTrue
+app.state.ready = False
+
 # CORS設定
 cors_origins = config.get("api.cors_origins", ["http://localhost:3000"])
 app.add_middleware(
@@ -40,17 +84,82 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 画像バイナリ系エンドポイントのメタデータをブラウザから読めるようにする
+    expose_headers=["X-Mesh-Vertices", "X-Mesh-Faces", "X-Operations-Applied", "X-Overlay-Scale", "X-Overlay-Swap"],
 )
 
-# グローバルプロセッサーインスタンス（遅延初期化）
+# レスポンス圧縮（ランドマーク等の数値JSONは数倍に縮む）
+# Accept-Encodingに応じてbr/gzipを自動選択し、小さいレスポンスは圧縮しない
+compress_min_size = config.get("api.compress_min_size", 1024)
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=compress_min_size)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=compress_min_size, compresslevel=5)
+
+# リクエストモデル
+class DeformRequest(BaseModel):
+    """メッシュ幾何変形リクエスト
+
+    landmarks/trianglesは要素ごとの検証を行わずにnumpyへ直接変換する。
+    大きなメッシュはlandmarks_b64/triangles_b64（float32/int32のリトルエンディアン生バイト列をbase64化）でも送信できる。
+    /analyzeが返したmesh_tokenを指定した場合はサーバー側にキャッシュしたメッシュを使う。
+    """
+    landmarks: Optional[Any] = None
+    triangles: Optional[Any] = None
+    landmarks_b64: Optional[str] = None
+    triangles_b64: Optional[str] = None
+    mesh_token: Optional[str] = None
+    ops: List[Dict[str, Any]]
+    px_per_mm: float
+
+    @model_validator(mode="after")
+    def _check_mesh(self):
+        if self.mesh_token is not None:
+            return self
+        if self.landmarks is None and self.landmarks_b64 is None:
+            raise ValueError("landmarks or landmarks_b64 is required")
+        if self.triangles is None and self.triangles_b64 is None:
+            raise ValueError("triangles or triangles_b64 is required")
+        return self
+
+def _decode_array(values: Any, encoded: Optional[str], dtype) -> np.ndarray:
+    """リスト形式またはbase64生バイト列からN×3配列を構築"""
+    try:
+        if encoded is not None:
+            return np.frombuffer(base64.b64decode(encoded), dtype=np.dtype(dtype).newbyteorder("<")).astype(dtype, copy=False).reshape(-1, 3)
+        # dtype推論なしで平坦化して読み込み
+        return np.fromiter(
+            itertools.chain.from_iterable(values), dtype=dtype, count=3 * len(values)
+        ).reshape(-1, 3)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid mesh array: {str(e)}")
+
+# グローバルプロセッサーインスタンス（起動時に初期化）
 face_processor: Optional[FaceMeshProcessor] = None
 mesh_editor: Optional[MeshEditor] = None
 nano_processor: Optional[NanoBananaProcessor] = None
 instruction_parser: Optional[InstructionParser] = None
+face_pipeline: Optional[FaceMeshPipeline] = None
+# 同期依存関数はスレッドプールから並行に呼ばれるため、二重初期化をロックで防ぐ
+_processors_lock = threading.Lock()
 
 def get_processors():
     """プロセッサーインスタンスを取得（依存性注入用）"""
-    global face_processor, mesh_editor, nano_processor, instruction_parser
+    if face_pipeline is None:
+        with _processors_lock:
+            _init_processors()
+    
+    return {
+        "face_processor": face_processor,
+        "mesh_editor": mesh_editor,
+        "nano_processor": nano_processor,
+        "instruction_parser": instruction_parser,
+        "pipeline": face_pipeline
+    }
+
+def _init_processors():
+    """未初期化のプロセッサーを生成（_processors_lockを保持して呼ぶこと）"""
+    global face_processor, mesh_editor, nano_processor, instruction_parser, face_pipeline
     
     if face_processor is None:
         face_processor = FaceMeshProcessor()
@@ -60,45 +169,257 @@ def get_processors():
         nano_processor = NanoBananaProcessor()
     if instruction_parser is None:
         instruction_parser = InstructionParser()
+    if face_pipeline is None:
+        face_pipeline = FaceMeshPipeline(
+            face_processor, mesh_editor, instruction_parser, nano_processor,
+            # 生成画像は元解像度で返すため縮小デコードしない（メッシュ頂点と画像の座標系も一致する）
+            decode_image=decode_upload_full,
+            executor=executor,
+            limiter=inference_limiter
+        )
+
+@app.on_event("startup")
+async def startup_event():
+    """起動時にプロセッサーを生成し、MediaPipeをウォームアップ（初回リクエストの遅延を回避）"""
+    processors = await run_blocking(get_processors)
+    await run_blocking(processors["face_processor"].warmup, config.get("face_mesh.warmup_px", 256))
+    app.state.ready = True
+
+# CPUバウンド処理（デコード・推論・エンコード）用スレッドプール
+executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# /analyzeで構築したメッシュのキャッシュ（/mesh/deform/jsonでmesh_tokenにより参照）
+# 複数ワーカーでトークンを共有するにはcache.mesh_dirの指定が必要（未指定ならプロセス内のみ。ディスクには書かない）
+mesh_cache = MeshCache(
+    max_entries=config.get("cache.max_mesh_entries", 128),
+    directory=config.get("cache.mesh_dir"),
+    ttl_sec=config.get("cache.ttl_sec", 3600)
+)
+
+# MediaPipe推論の同時実行数（スレッドプールを推論で埋め尽くさず、デコード・エンコードやヘルスチェックの分を残す）
+inference_limiter = anyio.Semaphore(config.get("face_mesh.max_concurrency", os.cpu_count() or 1))
+
+async def run_blocking(func, *args, **kwargs):
+    """同期処理をスレッドプールで実行（イベントループをブロックしない）"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+async def run_inference(func, *args, **kwargs):
+    """MediaPipe推論を含む同期処理を同時実行数を制限してスレッドプールで実行
+
+    process/build_mesh_syncを呼ぶ処理はすべてここ（またはlimiterを渡したFaceMeshPipeline）を経由させ、
+    run_blockingやrun_in_executorで直接実行しないこと。
+    """
+    async with inference_limiter:
+        return await run_blocking(func, *args, **kwargs)
+
+async def read_upload(upload: UploadFile) -> BinaryIO:
+    """
+    アップロードのサイズを検証し、ファイルオブジェクトのまま返す
     
-    return {
-        "face_processor": face_processor,
-        "mesh_editor": mesh_editor,
-        "nano_processor": nano_processor,
-        "instruction_parser": instruction_parser
-    }
+    Starletteのmultipartパーサーが既にSpooledTemporaryFile（大きければディスク）へ
+    書き出しているため、await upload.read()で全体をbytesに複製せずPILに直接渡す。
+    """
+    max_bytes = int(config.get("limits.max_image_mb", 10) * 1024 * 1024)
+    size = upload.size
+    if size is None:
+        upload.file.seek(0, os.SEEK_END)
+        size = upload.file.tell()
+    if size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image too large: {size} bytes (max {max_bytes})")
+    await upload.seek(0)
+    return upload.file
+
+def _read_into_buffer(source: BinaryIO, chunk_size: int = 1 << 20) -> memoryview:
+    """ファイル全体をサイズ分だけ事前確保したbytearrayへチャンク単位で読み込む（一括read()による再確保を避ける）"""
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = 0
+    while offset < size:
+        chunk = source.read(min(chunk_size, size - offset))
+        if not chunk:
+            break
+        view[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return view[:offset]
+
+def _digest_upload(source: BinaryIO) -> str:
+    """アップロード内容からメッシュキャッシュ用の短いトークンを生成（読み込み位置は先頭に戻す）"""
+    digest = hashlib.blake2b(digest_size=8)
+    source.seek(0)
+    for chunk in iter(lambda: source.read(1 << 20), b""):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+def decode_upload(source: Union[bytes, BinaryIO], max_side: Optional[int] = None) -> Image.Image:
+    """アップロード画像をデコード（JPEGはDCTスケーリングで縮小しながら読み込む）
+
+    MediaPipeは内部で192/256px程度に縮小するため、フル解像度でのデコードは不要。
+    draft()はJPEG以外では何もしない。sourceはbytesまたはシーク可能なファイルオブジェクト。
+    縮小前の元画像サイズ (幅, 高さ) は image.info["original_size"] に記録する
+    （メッシュ頂点はこのサイズのピクセル座標で構築される）。max_sideが0以下なら縮小しない。
+    """
+    if max_side is None:
+        max_side = config.get("limits.max_decode_px", 1024)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if turbo_jpeg is not None and source.read(2) == b"\xff\xd8":
+        try:
+            return _decode_jpeg_turbo(_read_into_buffer(source), max_side)
+        except Exception as e:
+            logger.warning("TurboJPEG decode failed, fallback to PIL: %s", e)
+    source.seek(0)
+    pil_image = Image.open(source)
+    original_size = pil_image.size
+    if max_side > 0:
+        pil_image.draft('RGB', (max_side, max_side))
+    pil_image.load()
+    pil_image.info["original_size"] = original_size
+    return pil_image
+
+def _decode_jpeg_turbo(image_bytes: bytes, max_side: int) -> Image.Image:
+    """libjpeg-turboでJPEGをデコード（長辺がmax_sideを下回らない範囲で1/2〜1/8に縮小）"""
+    width, height, _, _ = turbo_jpeg.decode_header(image_bytes)
+    long_side = max(width, height)
+    scaling_factor = None
+    for denom in (8, 4, 2):
+        if max_side > 0 and long_side // denom >= max_side:
+            scaling_factor = (1, denom)
+            break
+    arr = turbo_jpeg.decode(image_bytes, pixel_format=TJPF_RGB, scaling_factor=scaling_factor)
+    pil_image = Image.fromarray(arr)
+    pil_image.info["original_size"] = (width, height)
+    return pil_image
+
+def decode_upload_full(source: Union[bytes, BinaryIO]) -> Image.Image:
+    """アップロード画像を縮小せずにデコード（生成画像を元画像の解像度で返す統合処理用）"""
+    return decode_upload(source, max_side=0)
+
+def _original_size(pil_image: Image.Image) -> Tuple[int, int]:
+    """縮小デコード前の元画像サイズ (幅, 高さ)"""
+    return pil_image.info.get("original_size", pil_image.size)
+
+def _decode_scale(pil_image: Image.Image) -> float:
+    """元画像に対するデコード後画像の縮小率（縮小なしなら1.0）"""
+    return pil_image.size[0] / _original_size(pil_image)[0]
+
+def _decode_and_build_mesh(face_processor: FaceMeshProcessor, source: Union[bytes, BinaryIO]):
+    """画像のデコードと3D Face Mesh構築（同期版）"""
+    pil_image = decode_upload(source)
+    return pil_image, face_processor.build_mesh_sync(pil_image)
+
+# エンコード用バッファ（スレッドごとに1つを使い回し、リクエスト毎の確保を避ける）
+_encode_buffers = threading.local()
+
+def _reusable_buffer() -> io.BytesIO:
+    """現在のスレッド用のBytesIOを空にして返す（getvalue()の結果はコピーなので再利用しても安全）"""
+    buffered = getattr(_encode_buffers, "buffer", None)
+    if buffered is None:
+        buffered = _encode_buffers.buffer = io.BytesIO()
+    buffered.seek(0)
+    buffered.truncate()
+    return buffered
+
+def _encode_png(image: Image.Image) -> bytes:
+    """PIL画像をPNGエンコード（可逆。deflateは高速な低圧縮レベル）"""
+    buffered = _reusable_buffer()
+    image.save(buffered, format="PNG", compress_level=config.get("output.png_compress_level", 1))
+    return buffered.getvalue()
+
+def _encode_png_base64(image: Image.Image) -> str:
+    """PIL画像をPNGエンコードしてbase64文字列で返す"""
+    return b64encode(_encode_png(image)).decode()
+
+def _encode_image(image: Image.Image) -> Tuple[bytes, str]:
+    """
+    出力設定（output.format）に従って画像をエンコード
+    
+    Returns:
+        Tuple[bytes, str]: (エンコード済みバイト列, MIMEタイプ)
+    """
+    fmt = str(config.get("output.format", "png")).lower()
+    quality = config.get("output.quality", 85)
+    if fmt == "webp":
+        buffered = _reusable_buffer()
+        image.save(buffered, format="WEBP", quality=quality, method=4)
+        return buffered.getvalue(), "image/webp"
+    if fmt in ("jpeg", "jpg"):
+        buffered = _reusable_buffer()
+        image.convert('RGB').save(buffered, format="JPEG", quality=quality)
+        return buffered.getvalue(), "image/jpeg"
+    return _encode_png(image), "image/png"
+
+@functools.lru_cache(maxsize=8)
+def _placeholder_png_base64(size: int, color: Tuple[int, int, int]) -> str:
+    """単色プレースホルダー画像のbase64 PNG（サイズ・色ごとにキャッシュ）"""
+    return _encode_png_base64(Image.new('RGB', (size, size), color))
+
+def _render_mesh(face_processor: FaceMeshProcessor, mesh, background_image: Image.Image) -> Tuple[bytes, str]:
+    """メッシュを元画像に重ね描きしてエンコード（同期版）。(バイト列, MIMEタイプ)を返す"""
+    mesh_image = face_processor.visualize_mesh(
+        mesh, (800, 600), background_image=background_image, draw_indices=False
+    )
+    return _encode_image(mesh_image)
+
+def _accepts_msgpack(request: Request) -> bool:
+    """AcceptヘッダーでMessagePack応答が要求されているか"""
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return "application/msgpack" in accept or "application/x-msgpack" in accept
+
+def _to_data_url(data: bytes, media_type: str) -> str:
+    """エンコード済み画像をdata URLに変換"""
+    return f"data:{media_type};base64,{b64encode(data).decode()}"
+
+def _image_response(data: bytes, media_type: str, headers: Dict[str, Any]) -> Response:
+    """画像バイナリをそのまま返す（メタデータはX-ヘッダーに載せる）"""
+    return Response(data, media_type=media_type, headers={k: str(v) for k, v in headers.items()})
 
 @app.get("/")
 async def root():
     return {"message": "CosmeticSim-MVP API Server", "status": "running", "version": config.get("version")}
 
+# /healthで返す設定情報（起動後は変わらないため事前に構築）
+_HEALTH_CONFIG = {
+    "targets": config.get_targets(),
+    "app_name": config.get("app_name")
+}
+
 @app.get("/health")
 async def health_check():
-    """ヘルスチェックエンドポイント"""
-    try:
-        processors = get_processors()
-        return {
-            "status": "healthy",
-            "processors": {
-                "face_mesh": processors["face_processor"].is_ready(),
-                "mesh_editor": processors["mesh_editor"].is_ready(),
-                "nano_banana": processors["nano_processor"].is_ready(),
-                "instruction_parser": True
-            },
-            "config": {
-                "targets": config.get_targets(),
-                "app_name": config.get("app_name")
-            }
-        }
-    except Exception as e:
-        logger.error(f"Health check error: {str(e)}")
-        return {"status": "unhealthy", "error": str(e)}
+    """ヘルスチェックエンドポイント（プロセッサーには触れず、起動処理の完了有無だけを返す）"""
+    return {
+        "status": "healthy" if app.state.ready else "starting",
+        "config": _HEALTH_CONFIG
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """レディネスチェック（生成済みのプロセッサーの状態を返す。未生成でも生成はしない）"""
+    processors = {
+        "face_mesh": face_processor is not None and face_processor.is_ready(),
+        "mesh_editor": mesh_editor is not None and mesh_editor.is_ready(),
+        "nano_banana": nano_processor is not None and nano_processor.is_ready(),
+        "instruction_parser": instruction_parser is not None
+    }
+    ready = app.state.ready and all(processors.values())
+    return ORJSONResponse(
+        {"status": "ready" if ready else "starting", "processors": processors},
+        status_code=200 if ready else 503
+    )
 
 @app.post("/analyze")
 async def analyze_face(
+    request: Request,
     image: UploadFile = File(...),
     consent: bool = Form(False),
     px_per_mm: Optional[float] = Form(None),
+    include_mesh: bool = Form(True),
     processors: Dict = Depends(get_processors)
 ):
     """画像からFaceMesh抽出＆事前計測"""
@@ -106,21 +427,23 @@ async def analyze_face(
         if not consent:
             raise HTTPException(status_code=400, detail="Consent is required")
         
-        # 画像の読み込み
-        image_data = await image.read()
-        pil_image = Image.open(io.BytesIO(image_data))
-        
-        logger.info(f"Analyzing image: {image.filename}, size: {pil_image.size}")
+        # 画像の読み込み（同一画像ならキャッシュ済みメッシュを再利用）
+        image_file = await read_upload(image)
+        mesh_token = await run_blocking(_digest_upload, image_file)
+        face_mesh = await run_blocking(mesh_cache.get, mesh_token)
         
-        # 3D Face Mesh構築
-        face_mesh = await processors["face_processor"].build_mesh(pil_image)
+        logger.info("Analyzing image: %s, mesh_token: %s, cached: %s", image.filename, mesh_token, face_mesh is not None)
         
-        if not face_mesh:
-            raise HTTPException(status_code=400, detail="Failed to detect face or build mesh")
-        
-        # メッシュデータを抽出
-        landmarks = face_mesh.vertices.tolist()
-        triangles = face_mesh.faces.tolist()
+        if face_mesh is None:
+            pil_image = await run_blocking(decode_upload, image_file)
+            
+            # 3D Face Mesh構築（推論の同時実行数制限の下でスレッドプールで実行）
+            face_mesh = await run_inference(processors["face_processor"].build_mesh_sync, pil_image)
+            
+            if not face_mesh:
+                raise HTTPException(status_code=400, detail="Failed to detect face or build mesh")
+            
+            await run_blocking(mesh_cache.put, mesh_token, face_mesh)
         
         # 事前計測（簡易版）
         metrics_before = {
@@ -136,18 +459,59 @@ async def analyze_face(
         # px_per_mm推定（簡易版）
         estimated_px_per_mm = px_per_mm or 12.5  # デフォルト値
         
-        return JSONResponse({
-            "landmarks": landmarks,
-            "triangles": triangles,
+        result = {
+            "mesh_token": mesh_token,
+            "vertex_count": len(face_mesh.vertices),
+            "face_count": len(face_mesh.faces),
             "metrics_before": metrics_before,
             "px_per_mm": estimated_px_per_mm,
             "processing_time_ms": 0  # 実際の処理時間を測定
-        })
+        }
+        if include_mesh and _accepts_msgpack(request):
+            # float32/int32の生バイト列で返す（クライアントは np.frombuffer(...).reshape(shape) で復元）
+            vertices = np.ascontiguousarray(face_mesh.vertices, dtype=np.float32)
+            faces = np.ascontiguousarray(face_mesh.faces, dtype=np.int32)
+            result["landmarks_f32"] = vertices.tobytes()
+            result["landmarks_shape"] = vertices.shape
+            result["triangles_i32"] = faces.tobytes()
+            result["triangles_shape"] = faces.shape
+            return Response(msgpack.packb(result), media_type="application/msgpack")
+        if include_mesh:
+            # メッシュデータを抽出（orjsonがndarrayを直接シリアライズするため.tolist()しない）
+            result["landmarks"] = np.ascontiguousarray(face_mesh.vertices, dtype=np.float32)
+            result["triangles"] = np.ascontiguousarray(face_mesh.faces, dtype=np.int32)
+        
+        return ORJSONResponse(result)
         
     except Exception as e:
-        logger.error(f"Error analyzing face: {str(e)}")
+        logger.error("Error analyzing face: %s", e)
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+async def _visualize_mesh(image: UploadFile, processors: Dict) -> Tuple[bytes, str, Dict[str, Any]]:
+    """メッシュ可視化の共通処理。(画像バイト列, MIMEタイプ, mesh_info)を返す"""
+    # 画像の読み込み・3D Face Mesh構築（スレッドプールで実行）
+    image_file = await read_upload(image)
+    pil_image, face_mesh = await run_inference(
+        _decode_and_build_mesh, processors["face_processor"], image_file
+    )
+    
+    logger.info("Visualizing mesh from image: %s, size: %s", image.filename, pil_image.size)
+    
+    if not face_mesh:
+        raise HTTPException(status_code=400, detail="Failed to detect face or build mesh")
+    
+    # メッシュを可視化（元画像に重ね描き）してエンコード
+    image_bytes, media_type = await run_blocking(
+        _render_mesh, processors["face_processor"], face_mesh, pil_image
+    )
+    mesh_info = {
+        "vertices_count": len(face_mesh.vertices),
+        "faces_count": len(face_mesh.faces),
+        "original_image_size": _original_size(pil_image),
+        "decode_scale": _decode_scale(pil_image)
+    }
+    return image_bytes, media_type, mesh_info
+
 @app.post("/visualize-mesh")
 async def visualize_mesh(
     image: UploadFile = File(...),
@@ -159,40 +523,38 @@ async def visualize_mesh(
         if not consent:
             raise HTTPException(status_code=400, detail="Consent is required")
         
-        # 画像の読み込み
-        image_data = await image.read()
-        pil_image = Image.open(io.BytesIO(image_data))
-        
-        logger.info(f"Visualizing mesh from image: {image.filename}, size: {pil_image.size}")
-        
-        # 3D Face Mesh構築
-        face_mesh = await processors["face_processor"].build_mesh(pil_image)
+        image_bytes, media_type, mesh_info = await _visualize_mesh(image, processors)
         
-        if not face_mesh:
-            raise HTTPException(status_code=400, detail="Failed to detect face or build mesh")
+        return ORJSONResponse({
+            "success": True,
+            "mesh_image": _to_data_url(image_bytes, media_type),
+            "mesh_info": mesh_info
+        })
         
-        # メッシュを可視化（元画像に重ね描き）
-        mesh_image = processors["face_processor"].visualize_mesh(
-            face_mesh, (800, 600), background_image=pil_image, draw_indices=False
-        )
+    except Exception as e:
+        logger.error("Error visualizing mesh: %s", e)
+        raise HTTPException(status_code=500, detail=f"Mesh visualization failed: {str(e)}")
+
+@app.post("/visualize-mesh/image")
+async def visualize_mesh_image(
+    image: UploadFile = File(...),
+    consent: bool = Form(False),
+    processors: Dict = Depends(get_processors)
+):
+    """3D Face Meshの可視化画像をバイナリで直接返す（base64/JSONを経由しない）"""
+    try:
+        if not consent:
+            raise HTTPException(status_code=400, detail="Consent is required")
         
-        # 画像をbase64エンコード
-        buffered = io.BytesIO()
-        mesh_image.save(buffered, format="PNG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
+        image_bytes, media_type, mesh_info = await _visualize_mesh(image, processors)
         
-        return JSONResponse({
-            "success": True,
-            "mesh_image": f"data:image/png;base64,{img_base64}",
-            "mesh_info": {
-                "vertices_count": len(face_mesh.vertices),
-                "faces_count": len(face_mesh.faces),
-                "original_image_size": pil_image.size
-            }
+        return _image_response(image_bytes, media_type, {
+            "X-Mesh-Vertices": mesh_info["vertices_count"],
+            "X-Mesh-Faces": mesh_info["faces_count"]
         })
         
     except Exception as e:
-        logger.error(f"Error visualizing mesh: {str(e)}")
+        logger.error("Error visualizing mesh image: %s", e)
         raise HTTPException(status_code=500, detail=f"Mesh visualization failed: {str(e)}")
 
 @app.post("/debug/face-detection")
@@ -206,26 +568,26 @@ async def debug_face_detection(
         if not consent:
             raise HTTPException(status_code=400, detail="Consent is required")
 
-        image_data = await image.read()
-        pil_image = Image.open(io.BytesIO(image_data))
+        image_file = await read_upload(image)
+        pil_image = await run_blocking(decode_upload, image_file)
 
-        logger.info(f"Debugging face detection from image: {image.filename}, size: {pil_image.size}")
+        logger.info("Debugging face detection from image: %s, size: %s", image.filename, pil_image.size)
 
-        # MediaPipeで顔検出を直接テスト
-        import cv2
-        import numpy as np
-        
-        cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-        results = processors["face_processor"].face_mesh.process(cv_image)
+        # MediaPipeで顔検出を直接テスト（MediaPipeはRGB入力。RGB画像ならゼロコピー）
+        if pil_image.mode != 'RGB':
+            pil_image = pil_image.convert('RGB')
+        rgb_image = np.asarray(pil_image, dtype=np.uint8)
+        results = await run_inference(processors["face_processor"].process, rgb_image)
         
         face_detection_result = results.multi_face_landmarks[0] if results.multi_face_landmarks else None
         landmarks = face_detection_result
         
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True,
             "face_detected": face_detection_result is not None,
             "landmarks_count": len(landmarks.landmark) if landmarks else 0,
-            "image_size": pil_image.size,
+            "image_size": _original_size(pil_image),
+            "decode_scale": _decode_scale(pil_image),
             "face_detection_details": {
                 "result": str(face_detection_result) if face_detection_result else None,
                 "landmarks_sample": [
@@ -236,9 +598,46 @@ async def debug_face_detection(
         })
 
     except Exception as e:
-        logger.error(f"Error in face detection debug: {str(e)}")
+        logger.error("Error in face detection debug: %s", e)
         raise HTTPException(status_code=500, detail=f"Face detection debug failed: {str(e)}")
 
+async def _deform_mesh_image(image: UploadFile, prompt: str, processors: Dict) -> Tuple[bytes, str, Dict[str, Any]]:
+    """画像からのメッシュ変形の共通処理。(画像バイト列, MIMEタイプ, mesh_info)を返す"""
+    # 画像の読み込み・3D Face Mesh構築（スレッドプールで実行）
+    image_file = await read_upload(image)
+    pil_image, face_mesh = await run_inference(
+        _decode_and_build_mesh, processors["face_processor"], image_file
+    )
+    
+    logger.info("Deforming mesh from image: %s, prompt: %s", image.filename, prompt)
+    
+    if not face_mesh:
+        raise HTTPException(status_code=400, detail="Failed to detect face or build mesh")
+    
+    # プロンプトを解析して操作を取得
+    operations = processors["instruction_parser"].parse_instruction(prompt)
+    
+    if not operations:
+        raise HTTPException(status_code=400, detail="No valid operations found in prompt")
+    
+    # メッシュを変形
+    deformed_mesh = await processors["mesh_editor"].edit_mesh_batch(face_mesh, operations)
+    
+    # 変形後のメッシュを可視化（元画像に重ね描き）してエンコード
+    image_bytes, media_type = await run_blocking(
+        _render_mesh, processors["face_processor"], deformed_mesh, pil_image
+    )
+    mesh_info = {
+        "original_vertices_count": len(face_mesh.vertices),
+        "original_faces_count": len(face_mesh.faces),
+        "deformed_vertices_count": len(deformed_mesh.vertices),
+        "deformed_faces_count": len(deformed_mesh.faces),
+        "operations_applied": operations,
+        "original_image_size": _original_size(pil_image),
+        "decode_scale": _decode_scale(pil_image)
+    }
+    return image_bytes, media_type, mesh_info
+
 @app.post("/mesh/deform")
 async def deform_mesh(
     image: UploadFile = File(...),
@@ -250,71 +649,58 @@ async def deform_mesh(
     try:
         if not consent:
             raise HTTPException(status_code=400, detail="Consent is required")
-
-        # 画像の読み込み
-        image_data = await image.read()
-        pil_image = Image.open(io.BytesIO(image_data))
-        
-        logger.info(f"Deforming mesh from image: {image.filename}, prompt: {prompt}")
         
-        # 3D Face Mesh構築
-        face_mesh = await processors["face_processor"].build_mesh(pil_image)
+        image_bytes, media_type, mesh_info = await _deform_mesh_image(image, prompt, processors)
         
-        if not face_mesh:
-            raise HTTPException(status_code=400, detail="Failed to detect face or build mesh")
-        
-        # プロンプトを解析して操作を取得
-        operations = processors["instruction_parser"].parse_instruction(prompt)
-        
-        if not operations:
-            raise HTTPException(status_code=400, detail="No valid operations found in prompt")
-        
-        # メッシュを変形
-        deformed_mesh = await processors["mesh_editor"].edit_mesh(face_mesh, operations)
+        return ORJSONResponse({
+            "success": True,
+            "mesh_image": _to_data_url(image_bytes, media_type),
+            "mesh_info": mesh_info
+        })
         
-        # 変形後のメッシュを可視化（元画像に重ね描き）
-        mesh_image = processors["face_processor"].visualize_mesh(
-            deformed_mesh, (800, 600), background_image=pil_image, draw_indices=False
-        )
+    except Exception as e:
+        logger.error("Error deforming mesh: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Mesh deformation failed: {str(e)}")
+
+@app.post("/mesh/deform/image")
+async def deform_mesh_image(
+    image: UploadFile = File(...),
+    prompt: str = Form(...),
+    consent: bool = Form(False),
+    processors: Dict = Depends(get_processors)
+):
+    """変形後のメッシュ可視化画像をバイナリで直接返す"""
+    try:
+        if not consent:
+            raise HTTPException(status_code=400, detail="Consent is required")
         
-        # 画像をbase64エンコード
-        buffered = io.BytesIO()
-        mesh_image.save(buffered, format="PNG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
+        image_bytes, media_type, mesh_info = await _deform_mesh_image(image, prompt, processors)
         
-        return JSONResponse({
-            "success": True,
-            "mesh_image": f"data:image/png;base64,{img_base64}",
-            "mesh_info": {
-                "original_vertices_count": len(face_mesh.vertices),
-                "original_faces_count": len(face_mesh.faces),
-                "deformed_vertices_count": len(deformed_mesh.vertices),
-                "deformed_faces_count": len(deformed_mesh.faces),
-                "operations_applied": operations,
-                "original_image_size": pil_image.size
-            }
+        return _image_response(image_bytes, media_type, {
+            "X-Mesh-Vertices": mesh_info["deformed_vertices_count"],
+            "X-Mesh-Faces": mesh_info["deformed_faces_count"],
+            "X-Operations-Applied": len(mesh_info["operations_applied"])
         })
         
     except Exception as e:
-        logger.error(f"Error deforming mesh: {str(e)}", exc_info=True)
+        logger.error("Error deforming mesh image: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Mesh deformation failed: {str(e)}")
 
 # --- 画像Aのメッシュを画像Bへ重ねるための補助 ---
-def _get_keypoints_px(landmarks, width: int, height: int) -> np.ndarray:
-    """左目中心, 右目中心, 鼻尖 をピクセル座標で返す (3,2)"""
-    left_ids = [33, 7, 163, 144]
-    right_ids = [362, 382, 380, 374]
-    nose_ids = [1]
+# 位置合わせに使うランドマーク（左目, 右目, 鼻尖）
+_LEFT_EYE_IDS = np.array([33, 7, 163, 144])
+_RIGHT_EYE_IDS = np.array([362, 382, 380, 374])
+_NOSE_TIP_IDS = np.array([1])
 
-    def _avg(ids):
-        xs = [landmarks.landmark[i].x * width for i in ids]
-        ys = [landmarks.landmark[i].y * height for i in ids]
-        return np.array([float(np.mean(xs)), float(np.mean(ys))], dtype=np.float64)
-
-    left_eye = _avg(left_ids)
-    right_eye = _avg(right_ids)
-    nose_tip = _avg(nose_ids)
-    return np.stack([left_eye, right_eye, nose_tip], axis=0)
+def _get_keypoints_px(landmark_array: np.ndarray, width: int, height: int) -> np.ndarray:
+    """左目中心, 右目中心, 鼻尖 をピクセル座標で返す (3,2)"""
+    xy = landmark_array[:, :2]
+    keypoints = np.stack([
+        xy[_LEFT_EYE_IDS].mean(axis=0),
+        xy[_RIGHT_EYE_IDS].mean(axis=0),
+        xy[_NOSE_TIP_IDS].mean(axis=0)
+    ], axis=0).astype(np.float64)
+    return keypoints * np.array([width, height], dtype=np.float64)
 
 def _estimate_similarity(A: np.ndarray, B: np.ndarray):
     """A( N,2 ) -> B( N,2 ) の相似変換 (R(2x2), s, t(1x2)) を推定"""
@@ -324,17 +710,96 @@ def _estimate_similarity(A: np.ndarray, B: np.ndarray):
     muB = B.mean(axis=0)
     Ac = A - muA
     Bc = B - muB
+    if A.shape[1] == 2:
+        # 2次元は閉形式で解ける（SVD/LAPACK呼び出しを避ける）
+        dot = float(np.sum(Ac * Bc))
+        cross = float(np.sum(Ac[:, 0] * Bc[:, 1] - Ac[:, 1] * Bc[:, 0]))
+        theta = math.atan2(cross, dot)
+        cos_t, sin_t = math.cos(theta), math.sin(theta)
+        # 行ベクトル表記（XY @ R）の回転行列
+        R = np.array([[cos_t, sin_t], [-sin_t, cos_t]])
+        scale = math.hypot(dot, cross) / max(1e-8, float(np.sum(Ac ** 2)))
+        t = muB - scale * (muA @ R)
+        return R, scale, t
     S = Ac.T @ Bc / A.shape[0]
     U, svals, Vt = np.linalg.svd(S)
-    R = Vt.T @ U.T
+    # 行ベクトル表記（XY @ R）なので R = U @ Vt
+    R = U @ Vt
     if np.linalg.det(R) < 0:
         Vt[-1, :] *= -1
-        R = Vt.T @ U.T
+        svals[-1] *= -1
+        R = U @ Vt
     varA = np.sum(Ac ** 2) / A.shape[0]
     scale = np.sum(svals) / max(1e-8, varA)
     t = muB - scale * (muA @ R)
     return R, float(scale), t
 
+def _align_mesh(mesh: trimesh.Trimesh, A: np.ndarray, B: np.ndarray) -> Tuple[trimesh.Trimesh, float]:
+    """キーポイントA→Bの相似変換をメッシュのXYに適用。(位置合わせ済みメッシュ, スケール)を返す"""
+    R, s, t = _estimate_similarity(A, B)
+    # 非連続なスライスのままだとBLAS前にコピーされるため、連続バッファ上でその場計算
+    vertices = mesh.vertices
+    xy = np.ascontiguousarray(vertices[:, :2])
+    out = np.empty_like(xy)
+    np.matmul(xy, R, out=out)
+    out *= s
+    out += t
+    # 全頂点のコピー後に上書きせず、XYとZを直接書き込む
+    verts = np.empty_like(vertices)
+    verts[:, :2] = out
+    verts[:, 2] = vertices[:, 2]
+    return trimesh.Trimesh(vertices=verts, faces=mesh.faces, process=False), s
+
+async def _overlay_mesh(
+    source_image: UploadFile, target_image: UploadFile, swap: bool, processors: Dict
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """メッシュ重ね合わせの共通処理。(画像バイト列, MIMEタイプ, info)を返す"""
+    src_file = await read_upload(source_image)
+    tgt_file = await read_upload(target_image)
+    src_pil = await run_blocking(decode_upload, src_file)
+    tgt_pil = await run_blocking(decode_upload, tgt_file)
+    if src_pil.mode != 'RGB':
+        src_pil = src_pil.convert('RGB')
+    if tgt_pil.mode != 'RGB':
+        tgt_pil = tgt_pil.convert('RGB')
+
+    # A/Bのランドマーク抽出（MediaPipeはRGB入力のため、PILのバッファをコピーせずそのまま渡す）
+    src_cv = np.asarray(src_pil, dtype=np.uint8)
+    tgt_cv = np.asarray(tgt_pil, dtype=np.uint8)
+    src_res, tgt_res = await asyncio.gather(
+        run_inference(processors["face_processor"].process, src_cv),
+        run_inference(processors["face_processor"].process, tgt_cv)
+    )
+    if not src_res.multi_face_landmarks or not tgt_res.multi_face_landmarks:
+        raise HTTPException(status_code=400, detail="Failed to detect face on one of images")
+
+    src_landmarks = src_res.multi_face_landmarks[0]
+    tgt_landmarks = tgt_res.multi_face_landmarks[0]
+    src_lm = landmarks_to_array(src_landmarks)
+    tgt_lm = landmarks_to_array(tgt_landmarks)
+    if not swap:
+        # source のメッシュを target へ重ねる（デフォルト）
+        mesh_landmarks, mesh_shape, mesh_lm, base_lm, base_pil = src_landmarks, src_cv.shape, src_lm, tgt_lm, tgt_pil
+    else:
+        # target のメッシュを source へ重ねる（反転）
+        mesh_landmarks, mesh_shape, mesh_lm, base_lm, base_pil = tgt_landmarks, tgt_cv.shape, tgt_lm, src_lm, src_pil
+
+    # 検出済みランドマークを再利用してメッシュを構築し、重ね先の顔へ位置合わせ
+    mesh = await run_blocking(
+        processors["face_processor"].build_mesh_from_landmarks, mesh_landmarks, mesh_shape
+    )
+    A = _get_keypoints_px(mesh_lm, mesh_shape[1], mesh_shape[0])
+    B = _get_keypoints_px(base_lm, base_pil.size[0], base_pil.size[1])
+    aligned_mesh, s = _align_mesh(mesh, A, B)
+    over_img = await run_blocking(
+        processors["face_processor"].visualize_mesh,
+        aligned_mesh, (base_pil.size[0], base_pil.size[1]), background_image=base_pil, draw_indices=False
+    )
+
+    image_bytes, media_type = await run_blocking(_encode_image, over_img)
+    info = {"source_size": src_pil.size, "target_size": tgt_pil.size, "scale": s, "swap": swap}
+    return image_bytes, media_type, info
+
 @app.post("/mesh/overlay")
 async def overlay_mesh(
     source_image: UploadFile = File(...),
@@ -348,71 +813,40 @@ async def overlay_mesh(
         if not consent:
             raise HTTPException(status_code=400, detail="Consent is required")
 
-        src_bytes = await source_image.read()
-        tgt_bytes = await target_image.read()
-        src_pil = Image.open(io.BytesIO(src_bytes)).convert('RGB')
-        tgt_pil = Image.open(io.BytesIO(tgt_bytes)).convert('RGB')
-
-        # A/Bのランドマーク抽出
-        import cv2
-        src_cv = cv2.cvtColor(np.array(src_pil), cv2.COLOR_RGB2BGR)
-        tgt_cv = cv2.cvtColor(np.array(tgt_pil), cv2.COLOR_RGB2BGR)
-        src_res = processors["face_processor"].face_mesh.process(src_cv)
-        tgt_res = processors["face_processor"].face_mesh.process(tgt_cv)
-        if not src_res.multi_face_landmarks or not tgt_res.multi_face_landmarks:
-            raise HTTPException(status_code=400, detail="Failed to detect face on one of images")
-
-        src_lm = src_res.multi_face_landmarks[0]
-        tgt_lm = tgt_res.multi_face_landmarks[0]
-        sh, sw = src_cv.shape[:2]
-        th, tw = tgt_cv.shape[:2]
-        if not swap:
-            # source のメッシュを target へ重ねる（デフォルト）
-            src_mesh = await processors["face_processor"].build_mesh(src_pil)
-            if src_mesh is None:
-                raise HTTPException(status_code=400, detail="Failed to build mesh from source image")
-            A = _get_keypoints_px(src_lm, sw, sh)
-            B = _get_keypoints_px(tgt_lm, tw, th)
-            R, s, t = _estimate_similarity(A, B)
-            verts = src_mesh.vertices.copy()
-            XY = verts[:, :2]
-            XYt = s * (XY @ R) + t
-            verts[:, :2] = XYt
-            import trimesh
-            aligned_mesh = trimesh.Trimesh(vertices=verts, faces=src_mesh.faces)
-            over_img = processors["face_processor"].visualize_mesh(
-                aligned_mesh, (tgt_pil.size[0], tgt_pil.size[1]), background_image=tgt_pil, draw_indices=False
-            )
-        else:
-            # target のメッシュを source へ重ねる（反転）
-            tgt_mesh = await processors["face_processor"].build_mesh(tgt_pil)
-            if tgt_mesh is None:
-                raise HTTPException(status_code=400, detail="Failed to build mesh from target image")
-            A = _get_keypoints_px(tgt_lm, tw, th)
-            B = _get_keypoints_px(src_lm, sw, sh)
-            R, s, t = _estimate_similarity(A, B)
-            verts = tgt_mesh.vertices.copy()
-            XY = verts[:, :2]
-            XYt = s * (XY @ R) + t
-            verts[:, :2] = XYt
-            import trimesh
-            aligned_mesh = trimesh.Trimesh(vertices=verts, faces=tgt_mesh.faces)
-            over_img = processors["face_processor"].visualize_mesh(
-                aligned_mesh, (src_pil.size[0], src_pil.size[1]), background_image=src_pil, draw_indices=False
-            )
-
-        buf = io.BytesIO()
-        over_img.save(buf, format='PNG')
-        img_b64 = base64.b64encode(buf.getvalue()).decode()
+        image_bytes, media_type, info = await _overlay_mesh(source_image, target_image, swap, processors)
 
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True,
-            "mesh_image": f"data:image/png;base64,{img_b64}",
-            "info": {"source_size": src_pil.size, "target_size": tgt_pil.size, "scale": s, "swap": swap}
+            "mesh_image": _to_data_url(image_bytes, media_type),
+            "info": info
         })
 
     except Exception as e:
-        logger.error(f"Error overlaying mesh: {str(e)}", exc_info=True)
+        logger.error("Error overlaying mesh: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Mesh overlay failed: {str(e)}")
+
+@app.post("/mesh/overlay/image")
+async def overlay_mesh_image(
+    source_image: UploadFile = File(...),
+    target_image: UploadFile = File(...),
+    consent: bool = Form(False),
+    swap: bool = Form(True),
+    processors: Dict = Depends(get_processors)
+):
+    """重ね合わせ画像をバイナリで直接返す"""
+    try:
+        if not consent:
+            raise HTTPException(status_code=400, detail="Consent is required")
+
+        image_bytes, media_type, info = await _overlay_mesh(source_image, target_image, swap, processors)
+
+        return _image_response(image_bytes, media_type, {
+            "X-Overlay-Scale": f"{info['scale']:.6f}",
+            "X-Overlay-Swap": str(swap).lower()
+        })
+
+    except Exception as e:
+        logger.error("Error overlaying mesh image: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Mesh overlay failed: {str(e)}")
 
 @app.post("/edit/parse")
@@ -422,43 +856,48 @@ async def parse_edit_instruction(
 ):
     """テキスト指示を正規化"""
     try:
-        logger.info(f"Parsing instruction: {instruction}")
+        logger.info("Parsing instruction: %s", instruction)
         
         operations = processors["instruction_parser"].parse_instruction(instruction)
         
-        return JSONResponse({
+        return ORJSONResponse({
             "ops": operations
         })
         
     except Exception as e:
-        logger.error(f"Error parsing instruction: {str(e)}")
+        logger.error("Error parsing instruction: %s", e)
         raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
 
-@app.post("/mesh/deform")
-async def deform_mesh(
-    landmarks: List[List[float]],
-    triangles: List[List[int]],
-    ops: List[Dict[str, Any]],
-    px_per_mm: float,
+@app.post("/mesh/deform/json")
+async def deform_mesh_json(
+    body: DeformRequest,
     processors: Dict = Depends(get_processors)
 ):
     """メッシュ幾何変形"""
+    ops = body.ops
+    if body.mesh_token is not None:
+        cached_mesh = await run_blocking(mesh_cache.get, body.mesh_token)
+        if cached_mesh is None:
+            raise HTTPException(status_code=404, detail=f"Unknown or expired mesh_token: {body.mesh_token}")
+        # キャッシュ上のメッシュは共有されるため頂点のみコピー
+        vertices = cached_mesh.vertices.copy()
+        faces = cached_mesh.faces
+    else:
+        vertices = _decode_array(body.landmarks, body.landmarks_b64, np.float32)
+        faces = _decode_array(body.triangles, body.triangles_b64, np.int32)
     try:
-        logger.info(f"Deforming mesh with {len(ops)} operations")
+        logger.info("Deforming mesh with %s operations", len(ops))
         
-        # メッシュを再構築
-        import trimesh
-        mesh = trimesh.Trimesh(vertices=np.array(landmarks), faces=np.array(triangles))
+        # メッシュを再構築（trimeshの後処理は省略）
+        mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False, validate=False)
         
-        # 各操作を適用
-        edited_mesh = mesh
-        for op in ops:
-            edited_mesh = await processors["mesh_editor"].edit_mesh(edited_mesh, op, {})
+        # 全操作をまとめて1回で適用
+        edited_mesh = await processors["mesh_editor"].edit_mesh_batch(mesh, ops)
         
-        # 結果を返す
+        # 結果を返す（trimeshは内部でfloat64に変換するため出力時にfloat32へ戻す）
         mesh_after = {
-            "vertices": edited_mesh.vertices.tolist(),
-            "faces": edited_mesh.faces.tolist()
+            "vertices": np.ascontiguousarray(edited_mesh.vertices, dtype=np.float32),
+            "faces": np.ascontiguousarray(edited_mesh.faces, dtype=np.int32)
         }
         
         metrics_after = {
@@ -471,14 +910,14 @@ async def deform_mesh(
             "forehead_width_mm": 0.0
         }
         
-        return JSONResponse({
+        return ORJSONResponse({
             "mesh_after": mesh_after,
             "metrics_after": metrics_after,
             "processing_time_ms": 0
         })
         
     except Exception as e:
-        logger.error(f"Error deforming mesh: {str(e)}")
+        logger.error("Error deforming mesh: %s", e)
         raise HTTPException(status_code=500, detail=f"Mesh deformation failed: {str(e)}")
 
 @app.post("/guides")
@@ -490,17 +929,12 @@ async def generate_guides(
 ):
     """Depth/Normal/Displacement/Mask生成"""
     try:
-        logger.info(f"Generating guides at {render_px}px resolution")
+        logger.info("Generating guides at %spx resolution", render_px)
         
         # 簡易的なガイド画像生成（実際の実装では3Dレンダリング）
-        dummy_image = Image.new('RGB', (render_px, render_px), (128, 128, 128))
-        
-        # base64エンコード
-        buffered = io.BytesIO()
-        dummy_image.save(buffered, format="PNG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
+        img_base64 = _placeholder_png_base64(render_px, (128, 128, 128))
         
-        return JSONResponse({
+        return ORJSONResponse({
             "depth_png": img_base64,
             "normal_png": img_base64,
             "disp_png": img_base64,
@@ -508,7 +942,7 @@ async def generate_guides(
         })
         
     except Exception as e:
-        logger.error(f"Error generating guides: {str(e)}")
+        logger.error("Error generating guides: %s", e)
         raise HTTPException(status_code=500, detail=f"Guide generation failed: {str(e)}")
 
 @app.post("/image/compose")
@@ -521,17 +955,12 @@ async def compose_image(
 ):
     """nano banana でAfter生成"""
     try:
-        logger.info(f"Composing image with prompt: {prompt[:50]}...")
+        logger.info("Composing image with prompt: %s...", prompt[:50])
         
         # 簡易的な画像合成（実際の実装ではnano banana API呼び出し）
-        dummy_image = Image.new('RGB', (1024, 1024), (255, 255, 255))
-        
-        # base64エンコード
-        buffered = io.BytesIO()
-        dummy_image.save(buffered, format="PNG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
+        img_base64 = _placeholder_png_base64(1024, (255, 255, 255))
         
-        return JSONResponse({
+        return ORJSONResponse({
             "after_image_url": f"data:image/png;base64,{img_base64}",
             "params_json_url": None,
             "face_glb_url": None,
@@ -540,9 +969,38 @@ async def compose_image(
         })
         
     except Exception as e:
-        logger.error(f"Error composing image: {str(e)}")
+        logger.error("Error composing image: %s", e)
         raise HTTPException(status_code=500, detail=f"Image composition failed: {str(e)}")
 
+async def _process_face_mesh(
+    image: UploadFile, prompt: str, surgery_params: str, processors: Dict
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """統合処理の共通処理。(画像バイト列, MIMEタイプ, processing_info)を返す"""
+    # 画像の読み込み
+    image_file = await read_upload(image)
+    
+    # JSON形式の手術パラメータをパース
+    try:
+        surgery_dict = json.loads(surgery_params)
+    except json.JSONDecodeError:
+        surgery_dict = {}
+    
+    logger.info("Processing image: %s, prompt: %s...", image.filename, prompt[:50])
+    
+    # デコード〜メッシュ編集を1回のスレッドプール呼び出しで実行し、画像生成まで行う
+    result = await processors["pipeline"].run(image_file, prompt, surgery_dict)
+    if result is None:
+        raise HTTPException(status_code=400, detail="Failed to detect face or build mesh")
+    
+    image_bytes, media_type = await run_blocking(_encode_image, result["image"])
+    processing_info = {
+        "original_size": result["original_size"],
+        "mesh_vertices": result["mesh_vertices"],
+        "edited_features": list(surgery_dict.keys()) if surgery_dict else [],
+        "operations_applied": len(result["operations"])
+    }
+    return image_bytes, media_type, processing_info
+
 @app.post("/process-face-mesh")
 async def process_face_mesh(
     image: UploadFile = File(...),
@@ -552,64 +1010,92 @@ async def process_face_mesh(
 ):
     """統合処理エンドポイント（既存のNext.js APIとの互換性）"""
     try:
-        # 画像の読み込み
-        image_data = await image.read()
-        pil_image = Image.open(io.BytesIO(image_data))
-        
-        # JSON形式の手術パラメータをパース
-        try:
-            surgery_dict = json.loads(surgery_params)
-        except json.JSONDecodeError:
-            surgery_dict = {}
-        
-        logger.info(f"Processing image: {image.filename}, prompt: {prompt[:50]}...")
-        
-        # Step 1: 3D Face Mesh構築
-        logger.info("Step 1: Building 3D face mesh...")
-        face_mesh = await processors["face_processor"].build_mesh(pil_image)
-        
-        if not face_mesh:
-            raise HTTPException(status_code=400, detail="Failed to detect face or build mesh")
-        
-        # Step 2: プロンプト解析
-        logger.info("Step 2: Parsing prompt...")
-        operations = processors["instruction_parser"].parse_instruction(prompt)
-        
-        # Step 3: メッシュ編集
-        logger.info("Step 3: Editing mesh...")
-        edited_mesh = face_mesh
-        for operation in operations:
-            edited_mesh = await processors["mesh_editor"].edit_mesh(edited_mesh, operation, surgery_dict)
-        
-        # Step 4: 画像生成（簡易版）
-        logger.info("Step 4: Generating final image...")
-        result_image = await processors["nano_processor"].generate_image(edited_mesh, pil_image)
+        image_bytes, media_type, processing_info = await _process_face_mesh(
+            image, prompt, surgery_params, processors
+        )
         
         # 結果をbase64エンコードして返却
-        buffered = io.BytesIO()
-        result_image.save(buffered, format="PNG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
-        
-        return JSONResponse({
+        return ORJSONResponse({
             "success": True,
-            "image": f"data:image/png;base64,{img_base64}",
-            "processing_info": {
-                "original_size": pil_image.size,
-                "mesh_vertices": len(face_mesh.vertices) if face_mesh else 0,
-                "edited_features": list(surgery_dict.keys()) if surgery_dict else [],
-                "operations_applied": len(operations)
-            }
+            "image": _to_data_url(image_bytes, media_type),
+            "processing_info": processing_info
+        })
+        
+    except Exception as e:
+        logger.error("Error processing face mesh: %s", e)
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+@app.post("/process-face-mesh/image")
+async def process_face_mesh_image(
+    image: UploadFile = File(...),
+    prompt: str = Form(...),
+    surgery_params: str = Form(default="{}"),
+    processors: Dict = Depends(get_processors)
+):
+    """統合処理の結果画像をバイナリで直接返す"""
+    try:
+        image_bytes, media_type, processing_info = await _process_face_mesh(
+            image, prompt, surgery_params, processors
+        )
+        
+        return _image_response(image_bytes, media_type, {
+            "X-Mesh-Vertices": processing_info["mesh_vertices"],
+            "X-Operations-Applied": processing_info["operations_applied"]
         })
         
     except Exception as e:
-        logger.error(f"Error processing face mesh: {str(e)}")
+        logger.error("Error processing face mesh image: %s", e)
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
+def _run_gunicorn(host: str, port: int, workers: int, keep_alive: int, timeout: int):
+    """Gunicorn + UvicornWorkerで本番起動（ワーカープロセスの監視・再起動はGunicornに任せる）"""
+    from gunicorn.app.base import BaseApplication
+
+    class _Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            # UvicornWorkerはuvloop/httptoolsがインストールされていれば自動で使う
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("keepalive", keep_alive)
+            self.cfg.set("timeout", timeout)
+            # マスターでアプリ（cv2/trimesh/mediapipe等のモジュール）を読み込んでからforkし、コードページを共有する
+            # （MediaPipeのグラフ自体は各ワーカーのstartupで生成）
+            self.cfg.set("preload_app", True)
+
+        def load(self):
+            return app
+
+    _Server().run()
+
 if __name__ == "__main__":
     api_config = config.get_api_config()
-    uvicorn.run(
-        "app:app", 
-        host=api_config.get("host", "0.0.0.0"), 
-        port=api_config.get("port", 8000), 
-        reload=True
-    )
+    host = api_config.get("host", "0.0.0.0")
+    port = api_config.get("port", 8000)
+    keep_alive = api_config.get("keep_alive_sec", 15)
+    # 開発時（DEV=true）のみ自動リロード（単一プロセス）
+    # 本番はGunicornがワーカーごとにアプリを読み込み、プロセッサーも各ワーカーのstartupで個別に初期化・ウォームアップされる
+    dev_mode = os.getenv("DEV", "").lower() == "true"
+    # api.workersが0以下なら自動（CPU数-1）
+    workers = int(api_config.get("workers", 0) or 0)
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+    if dev_mode:
+        uvicorn.run("app:app", host=host, port=port, reload=True, timeout_keep_alive=keep_alive)
+    else:
+        if workers > 1 and mesh_cache.directory is None:
+            logger.warning(
+                "cache.mesh_dir is not set: mesh_token issued by one of %d workers is not visible to the others", workers
+            )
+        try:
+            _run_gunicorn(host, port, workers, keep_alive, api_config.get("timeout", 120))
+        except ImportError:
+            # Gunicorn非対応環境（Windows等）ではuvicornのマルチワーカーで起動
+            # （WindowsにはuvloopがないためイベントループとHTTPパーサーはuvicornの自動選択に任せる）
+            uvicorn.run(
+                "app:app",
+                host=host,
+                port=port,
+                timeout_keep_alive=keep_alive,
+                workers=workers
+            )
@@ -1,11 +1,29 @@
 import yaml
 import os
-from typing import Dict, Any, List, Optional
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# get()でキーが存在しないことを表す番兵
+_MISSING = object()
+
+# 部位ごとの変形量の範囲 (最小, 最大)
+_DELTA_LIMITS: Mapping[str, Tuple[float, float]] = MappingProxyType({
+    "nasal_tip_mm": (-3.0, 3.0),
+    "nasal_bridge_mm": (-2.5, 2.5),
+    "eye_size_ratio": (-0.3, 0.3),
+    "jaw_width_mm": (-4.0, 4.0),
+    "lip_thickness_mm": (-2.0, 2.0),
+    "cheek_contour_mm": (-3.5, 3.5),
+    "forehead_width_mm": (-5.0, 5.0),
+    "submental_fat_mm": (-3.0, 3.0)
+})
+_MAX_DELTAS: Mapping[str, float] = MappingProxyType({k: hi for k, (lo, hi) in _DELTA_LIMITS.items()})
+_MIN_DELTAS: Mapping[str, float] = MappingProxyType({k: lo for k, (lo, hi) in _DELTA_LIMITS.items()})
+
 class Config:
     """設定管理クラス"""
     
@@ -21,6 +39,8 @@ class Config:
         
         self.config_path = Path(config_path)
         self._config = self._load_config()
+        self._flat = self._flatten(self._config)
+        self._targets_set = frozenset(self.get_targets())
         
         logger.info(f"Config loaded from: {self.config_path}")
     
@@ -42,6 +62,21 @@ class Config:
             logger.error(f"Error parsing config file: {e}")
             return self._get_default_config()
     
+    @staticmethod
+    def _flatten(config: Dict[str, Any]) -> Mapping[str, Any]:
+        """ネストした設定を "api.cors_origins" のようなドット区切りキーの平坦な辞書に変換（中間の辞書も含む）"""
+        flat: Dict[str, Any] = {}
+        
+        def _walk(node: Dict[str, Any], prefix: str):
+            for k, v in node.items():
+                key = f"{prefix}{k}"
+                flat[key] = v
+                if isinstance(v, dict):
+                    _walk(v, f"{key}.")
+        
+        _walk(config or {}, "")
+        return MappingProxyType(flat)
+    
     def _apply_env_overrides(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """環境変数で設定をオーバーライド"""
         # API設定の環境変数オーバーライド
@@ -85,18 +120,24 @@ class Config:
                 "min_delta_mm": -4.0,
                 "max_image_mb": 10,
                 "min_image_px": 1024,
+                "max_decode_px": 1024,
                 "max_processing_time_sec": 120
             },
             "api": {
                 "host": "0.0.0.0",
                 "port": 8000,
-                "workers": 1,
+                "workers": 0,
                 "timeout": 120
             }
         }
     
     def get(self, key: str, default: Any = None) -> Any:
         """設定値を取得（ドット記法対応）"""
+        # 読み込み時に平坦化した辞書を1回引くだけで済ませる
+        value = self._flat.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
         keys = key.split('.')
         value = self._config
         
@@ -154,54 +195,35 @@ class Config:
     
     def is_target_supported(self, target: str) -> bool:
         """指定された部位がサポートされているかチェック"""
-        return target in self.get_targets()
+        return target in self._targets_set
     
     def get_max_delta(self, target: str) -> float:
         """指定部位の最大変形量を取得"""
-        limits = self.get_limits()
-        
-        # 部位によって最大変形量を調整
-        target_max_deltas = {
-            "nasal_tip_mm": 3.0,
-            "nasal_bridge_mm": 2.5,
-            "eye_size_ratio": 0.3,
-            "jaw_width_mm": 4.0,
-            "lip_thickness_mm": 2.0,
-            "cheek_contour_mm": 3.5,
-            "forehead_width_mm": 5.0,
-            "submental_fat_mm": 3.0
-        }
-        
-        return target_max_deltas.get(target, limits.get("max_delta_mm", 4.0))
+        max_delta = _MAX_DELTAS.get(target)
+        return max_delta if max_delta is not None else self.get("limits.max_delta_mm", 4.0)
     
     def get_min_delta(self, target: str) -> float:
         """指定部位の最小変形量を取得"""
-        limits = self.get_limits()
-        
-        # 部位によって最小変形量を調整
-        target_min_deltas = {
-            "nasal_tip_mm": -3.0,
-            "nasal_bridge_mm": -2.5,
-            "eye_size_ratio": -0.3,
-            "jaw_width_mm": -4.0,
-            "lip_thickness_mm": -2.0,
-            "cheek_contour_mm": -3.5,
-            "forehead_width_mm": -5.0,
-            "submental_fat_mm": -3.0
-        }
-        
-        return target_min_deltas.get(target, limits.get("min_delta_mm", -4.0))
+        min_delta = _MIN_DELTAS.get(target)
+        return min_delta if min_delta is not None else self.get("limits.min_delta_mm", -4.0)
+    
+    def get_delta_range(self, target: str) -> Tuple[float, float]:
+        """指定部位の変形量の範囲 (最小, 最大) を取得"""
+        delta_range = _DELTA_LIMITS.get(target)
+        if delta_range is None:
+            return self.get("limits.min_delta_mm", -4.0), self.get("limits.max_delta_mm", 4.0)
+        return delta_range
     
     def validate_delta(self, target: str, delta: float) -> bool:
         """変形量が有効範囲内かチェック"""
-        min_delta = self.get_min_delta(target)
-        max_delta = self.get_max_delta(target)
-        
+        min_delta, max_delta = self.get_delta_range(target)
         return min_delta <= delta <= max_delta
     
     def reload(self):
         """設定を再読み込み"""
         self._config = self._load_config()
+        self._flat = self._flatten(self._config)
+        self._targets_set = frozenset(self.get_targets())
         logger.info("Config reloaded")
     
     def to_dict(self) -> Dict[str, Any]:
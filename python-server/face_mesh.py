@@ -1,16 +1,79 @@
+import asyncio
 import cv2
 import numpy as np
 from PIL import Image
 import mediapipe as mp
+from mediapipe.python.solutions.face_mesh_connections import FACEMESH_TESSELATION
 import trimesh
 from typing import Optional, Dict, Any, Tuple, List
 from config import config
 import logging
-import io
+import math
+import os
+import queue
+import threading
+from types import SimpleNamespace
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 
 logger = logging.getLogger(__name__)
 
+# テッセレーションの重複のない辺 (E,2)。接続は定数なので読み込み時に一度だけ作る
+_TESS_EDGES = np.unique(
+    np.sort(np.fromiter((c for e in FACEMESH_TESSELATION for c in e), dtype=np.int32).reshape(-1, 2), axis=1),
+    axis=0
+)
+
+def _edges_to_triangles(edges: np.ndarray) -> np.ndarray:
+    """辺 (E,2)（各行 i<j）から、3辺がすべて揃っている三角形 (F,3) を列挙"""
+    neighbors = [set() for _ in range(int(edges.max()) + 1)]
+    for i, j in edges.tolist():
+        neighbors[i].add(j)
+        neighbors[j].add(i)
+    # k > j の条件で各三角形を1回だけ数える
+    triangles = [(i, j, k) for i, j in edges.tolist() for k in neighbors[i] & neighbors[j] if k > j]
+    return np.array(triangles, dtype=np.int32).reshape(-1, 3)
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """MediaPipeのランドマークを正規化座標の (N,3) float32配列に変換"""
+    points = landmarks.landmark
+    return np.fromiter(
+        (c for lm in points for c in (lm.x, lm.y, lm.z)), dtype=np.float32, count=3 * len(points)
+    ).reshape(-1, 3)
+
+# MediaPipeの標準トポロジ（テッセレーションの辺から導いた三角形）。頂点数は468（虹彩点を除く）
+_CANONICAL_FACES = _edges_to_triangles(_TESS_EDGES)
+_CANONICAL_VERTEX_COUNT = 468
+
+# 向き判定に使う左右の目の代表点
+_LEFT_EYE_IDS = np.array([33, 7, 163, 144])
+_RIGHT_EYE_IDS = np.array([362, 382, 380, 374])
+
+def _to_rgb_array(pil_image: Image.Image) -> np.ndarray:
+    """PIL画像をMediaPipeに渡すRGB配列に変換（RGB画像ならコピーせずバッファを共有）"""
+    if pil_image.mode != 'RGB':
+        pil_image = pil_image.convert('RGB')
+    return np.asarray(pil_image, dtype=np.uint8)
+
+def _source_image_shape(pil_image: Image.Image, rgb_image: np.ndarray) -> Tuple[int, ...]:
+    """ランドマークをスケールする画像形状（縮小デコード時はinfo["original_size"]の元画像サイズ）"""
+    original_size = pil_image.info.get("original_size")
+    if original_size is None:
+        return rgb_image.shape
+    width, height = original_size
+    return (int(height), int(width)) + rgb_image.shape[2:]
+
+# 半径1の点として塗る 3x3 近傍のオフセット
+_SPLAT_OFFSETS = np.array([-1, 0, 1])
+
+def _splat_points(img: np.ndarray, xs: np.ndarray, ys: np.ndarray, color: Tuple[int, int, int]):
+    """点群を半径1の点（3x3ピクセル）として一括で塗る（画像外の点は描かない）"""
+    h, w = img.shape[:2]
+    inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+    xs = (xs[inside, None, None] + _SPLAT_OFFSETS[None, None, :]).clip(0, w - 1)
+    ys = (ys[inside, None, None] + _SPLAT_OFFSETS[None, :, None]).clip(0, h - 1)
+    img[ys, xs] = color
+
 class FaceMeshProcessor:
     def __init__(self):
         """3D face mesh処理クラス"""
@@ -18,20 +81,129 @@ class FaceMeshProcessor:
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
         
-        # Face mesh初期化（横顔・斜め顔にも対応）
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        # FaceMeshグラフはスレッドセーフではないため、インスタンスをプールして
+        # 推論ごとに1つを貸し出す（同時実行数 = プールサイズ）。
+        # 起動時に作るのは1つだけで、2つ目以降は同時リクエストが来たときに初めて生成する
+        pool_size = int(config.get(
+            "face_mesh.pool_size", config.get("face_mesh.max_concurrency", os.cpu_count() or 1)
+        ))
+        self._pool_size = max(1, pool_size)
+        self._pool: "queue.Queue" = queue.Queue(maxsize=self._pool_size)
+        self._pool_created = 0
+        self._pool_lock = threading.Lock()
+        
+        # Tasks API（GPUデリゲート対応）が設定されていれば優先して使用
+        self.face_mesh = None
+        self.face_landmarker = None
+        if config.get("face_mesh.backend", "solutions") == "tasks":
+            self.face_landmarker = self._create_face_landmarker()
+        
+        if self.face_landmarker is None:
+            self.face_mesh = self._create_face_mesh()
+        self._pool.put(self.face_landmarker if self.face_landmarker is not None else self.face_mesh)
+        self._pool_created = 1
+        
+        # オーバーレイ描画用の作業バッファ（スレッドプールから並行に呼ばれるためスレッドごとに保持）
+        self._overlay_buffers = threading.local()
+        
+        logger.info(f"FaceMeshProcessor initialized (max_pool_size={self._pool_size})")
+    
+    def _acquire_graph(self):
+        """プールから推論用インスタンスを借りる（空きが無く上限未満なら新しく生成）"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._pool_lock:
+            grow = self._pool_created < self._pool_size
+            if grow:
+                self._pool_created += 1
+        if grow:
+            try:
+                graph = self._create_face_landmarker() if self.face_landmarker is not None else self._create_face_mesh()
+            except Exception as e:
+                logger.warning(f"Failed to add FaceMesh instance to pool: {e}")
+                graph = None
+            if graph is not None:
+                return graph
+            # 生成に失敗した場合はこれ以上増やさず、既存インスタンスの返却を待つ
+            with self._pool_lock:
+                self._pool_created -= 1
+                self._pool_size = self._pool_created
+        
+        # 空きインスタンスが無ければ返却されるまで待つ
+        return self._pool.get()
+    
+    def _create_face_mesh(self):
+        """solutions APIのFaceMeshを生成（横顔・斜め顔にも対応）"""
+        return self.mp_face_mesh.FaceMesh(
             static_image_mode=True,
             max_num_faces=1,
             refine_landmarks=True,
             min_detection_confidence=0.3,  # 検出感度を上げる
             min_tracking_confidence=0.3
         )
-        
-        logger.info("FaceMeshProcessor initialized")
+    
+    def _create_face_landmarker(self):
+        """mediapipe.tasksのFaceLandmarkerを生成（失敗時はNoneを返しsolutions APIにフォールバック）"""
+        model_path = config.get("face_mesh.model_asset_path", "models/face_landmarker.task")
+        use_gpu = str(config.get("face_mesh.delegate", "cpu")).lower() == "gpu"
+        try:
+            from mediapipe.tasks.python import BaseOptions
+            from mediapipe.tasks.python import vision
+            
+            base_options = BaseOptions(
+                model_asset_path=model_path,
+                delegate=BaseOptions.Delegate.GPU if use_gpu else BaseOptions.Delegate.CPU
+            )
+            options = vision.FaceLandmarkerOptions(
+                base_options=base_options,
+                running_mode=vision.RunningMode.IMAGE,
+                num_faces=1,
+                min_face_detection_confidence=0.3,
+                min_face_presence_confidence=0.3,
+                min_tracking_confidence=0.3
+            )
+            landmarker = vision.FaceLandmarker.create_from_options(options)
+            logger.info(f"FaceLandmarker initialized (model={model_path}, gpu={use_gpu})")
+            return landmarker
+        except Exception as e:
+            logger.warning(f"FaceLandmarker init failed, fallback to solutions FaceMesh: {e}")
+            return None
     
     def is_ready(self) -> bool:
         """プロセッサーが準備完了かチェック"""
-        return self.face_mesh is not None
+        return self.face_mesh is not None or self.face_landmarker is not None
+    
+    def process(self, image: np.ndarray):
+        """
+        MediaPipeで推論（スレッドプールから並行に呼ばれても安全）
+        
+        Tasks API使用時も、solutions APIと同じく results.multi_face_landmarks[i].landmark
+        の形で結果を返す。
+        """
+        graph = self._acquire_graph()
+        try:
+            if self.face_landmarker is None:
+                return graph.process(image)
+            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(image))
+            result = graph.detect(mp_image)
+        finally:
+            self._pool.put(graph)
+        faces = [SimpleNamespace(landmark=landmarks) for landmarks in result.face_landmarks]
+        return SimpleNamespace(multi_face_landmarks=faces or None)
+    
+    def warmup(self, size: int = 256):
+        """ダミー画像で生成済みの各インスタンスを1回ずつ推論し、XNNPACK/GPUデリゲートの初期化をリクエスト処理の外で済ませる"""
+        try:
+            dummy = np.zeros((size, size, 3), dtype=np.uint8)
+            # プールはFIFOなので、空きインスタンス数回の呼び出しで全インスタンスが一巡する
+            for _ in range(self._pool.qsize()):
+                self.process(dummy)
+            logger.info(f"FaceMeshProcessor warmed up ({size}x{size})")
+        except Exception as e:
+            logger.warning(f"FaceMeshProcessor warmup failed: {e}")
     
     async def build_mesh(self, pil_image: Image.Image) -> Optional[trimesh.Trimesh]:
         """
@@ -43,62 +215,40 @@ class FaceMeshProcessor:
         Returns:
             trimesh.Trimesh: 3Dメッシュオブジェクト
         """
+        # 推論とメッシュ構築はブロッキング処理なので、イベントループを塞がないよう別スレッドで実行
+        return await asyncio.to_thread(self.build_mesh_sync, pil_image)
+    
+    def build_mesh_sync(self, pil_image: Image.Image) -> Optional[trimesh.Trimesh]:
+        """build_meshの同期版（スレッドプールでの実行用）"""
         try:
-            # PIL画像をOpenCV形式に変換
-            cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+            # MediaPipeはRGB入力を前提とするため、BGR変換はせずそのまま渡す
+            rgb_image = _to_rgb_array(pil_image)
             
-            # 顔の向きを検出
-            face_orientation = self._detect_face_orientation(cv_image)
-            logger.info(f"Detected face orientation: {face_orientation}")
-            
-            # MediaPipeで顔のランドマーク検出
-            results = self.face_mesh.process(cv_image)
+            # MediaPipeで顔のランドマーク検出（1画像につき推論は1回のみ）
+            results = self.process(rgb_image)
             
             if not results.multi_face_landmarks:
                 logger.warning("No face landmarks detected")
                 return None
             
-            # 最初の顔のランドマークを取得
+            # 最初の顔のランドマークから向きの判定とメッシュ構築を行う
             face_landmarks = results.multi_face_landmarks[0]
+            mesh = self.build_mesh_from_landmarks(face_landmarks, _source_image_shape(pil_image, rgb_image))
             
-            # 3Dメッシュに変換（顔の向きを考慮）
-            mesh = self._landmarks_to_mesh(face_landmarks, cv_image.shape, face_orientation)
-            
-            logger.info(f"Successfully built 3D mesh with {len(mesh.vertices)} vertices for {face_orientation} face")
+            logger.info(f"Successfully built 3D mesh with {len(mesh.vertices)} vertices")
             return mesh
             
         except Exception as e:
             logger.error(f"Error building mesh: {str(e)}")
             return None
     
-    def _detect_face_orientation(self, cv_image) -> str:
-        """顔の向きを検出"""
+    def _orientation_from_landmarks(self, landmark_array: np.ndarray) -> str:
+        """検出済みのランドマーク配列 (N,3) から顔の向きを判定（推論は行わない）"""
         try:
-            # 簡易的な顔の向き検出
-            # 左右の目の位置を比較して判定
-            results = self.face_mesh.process(cv_image)
-            if not results.multi_face_landmarks:
-                return "unknown"
-            
-            landmarks = results.multi_face_landmarks[0]
-            
-            # 左右の目の中心点を取得
-            left_eye_center = np.mean([
-                [landmarks.landmark[33].x, landmarks.landmark[33].y],
-                [landmarks.landmark[7].x, landmarks.landmark[7].y],
-                [landmarks.landmark[163].x, landmarks.landmark[163].y],
-                [landmarks.landmark[144].x, landmarks.landmark[144].y]
-            ], axis=0)
-            
-            right_eye_center = np.mean([
-                [landmarks.landmark[362].x, landmarks.landmark[362].y],
-                [landmarks.landmark[382].x, landmarks.landmark[382].y],
-                [landmarks.landmark[380].x, landmarks.landmark[380].y],
-                [landmarks.landmark[374].x, landmarks.landmark[374].y]
-            ], axis=0)
-            
-            # 目の位置差から向きを判定
-            eye_diff = left_eye_center[0] - right_eye_center[0]
+            # 左右の目の中心X座標の差から向きを判定
+            left_eye_x = landmark_array[_LEFT_EYE_IDS, 0].mean()
+            right_eye_x = landmark_array[_RIGHT_EYE_IDS, 0].mean()
+            eye_diff = left_eye_x - right_eye_x
             
             if abs(eye_diff) < 0.1:
                 return "front"  # 正面
@@ -111,7 +261,29 @@ class FaceMeshProcessor:
             logger.warning(f"Error detecting face orientation: {str(e)}")
             return "unknown"
     
-    def _landmarks_to_mesh(self, landmarks, image_shape: Tuple[int, int, int], face_orientation: str = "front") -> trimesh.Trimesh:
+    def build_mesh_from_landmarks(self, landmarks, image_shape: Tuple[int, ...]) -> trimesh.Trimesh:
+        """
+        検出済みのランドマークから3Dメッシュを構築（MediaPipeの再推論を行わない）
+        
+        Args:
+            landmarks: MediaPipeの顔ランドマーク（process()の結果のmulti_face_landmarks[i]）
+            image_shape: 推論に使った画像の形状 (height, width, ...)
+            
+        Returns:
+            trimesh.Trimesh: 3Dメッシュ
+        """
+        landmark_array = landmarks_to_array(landmarks)
+        face_orientation = self._orientation_from_landmarks(landmark_array)
+        logger.info(f"Detected face orientation: {face_orientation}")
+        return self._landmarks_to_mesh(landmarks, image_shape, face_orientation, landmark_array)
+    
+    def _landmarks_to_mesh(
+        self,
+        landmarks,
+        image_shape: Tuple[int, int, int],
+        face_orientation: str = "front",
+        landmark_array: Optional[np.ndarray] = None
+    ) -> trimesh.Trimesh:
         """
         顔のランドマークから3Dメッシュを生成（顔の向きを考慮）
         
@@ -119,37 +291,28 @@ class FaceMeshProcessor:
             landmarks: MediaPipeの顔ランドマーク
             image_shape: 画像の形状 (height, width, channels)
             face_orientation: 顔の向き ("front", "left", "right", "unknown")
+            landmark_array: landmarks_to_array()済みの配列（渡した場合はその場でスケールして頂点に使う）
             
         Returns:
             trimesh.Trimesh: 3Dメッシュ
         """
         height, width = image_shape[:2]
         
-        # ランドマークを3D座標に変換（顔の向きを考慮）
-        vertices = []
-        for landmark in landmarks.landmark:
-            # 正規化座標を実際のピクセル座標に変換
-            x = landmark.x * width
-            y = landmark.y * height
-            z = landmark.z * width  # Z座標もスケール調整
-            
-            # 顔の向きに応じて座標を調整
-            if face_orientation == "left":
-                # 左向きの場合、Z座標を調整
-                z = z * 0.5  # 奥行きを浅くする
-            elif face_orientation == "right":
-                # 右向きの場合、Z座標を調整
-                z = z * 0.5  # 奥行きを浅くする
-            
-            vertices.append([x, y, z])
+        # 顔の向きに応じたZ座標の調整（横向きは奥行きを浅くする）
+        z_scale = 0.5 if face_orientation in ("left", "right") else 1.0
         
-        vertices = np.array(vertices)
+        # ランドマークを正規化座標の (N,3) 配列として一括で読み込み、ピクセル座標にスケール
+        # （Z座標も画像幅でスケール調整）
+        vertices = landmark_array if landmark_array is not None else landmarks_to_array(landmarks)
+        vertices *= np.array([width, height, width * z_scale], dtype=np.float32)
         
         # より効率的な面生成：Delaunay三角分割を使用
         faces = self._generate_triangular_faces(vertices)
         
         # trimeshオブジェクトを作成（画像ピクセル座標のまま保持）
-        mesh = trimesh.Trimesh(vertices=vertices, faces=faces)
+        # 頂点 float32・面 int32 のまま渡す（trimesh内部では float64/int64 で保持される）
+        # ランドマーク番号と頂点番号を一致させるため、頂点の結合などの前処理は行わない
+        mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False, validate=False)
         # 元画像サイズ・スケール情報をメタデータとして保持
         try:
             mesh.metadata = getattr(mesh, 'metadata', {}) or {}
@@ -157,11 +320,9 @@ class FaceMeshProcessor:
             # 推定px/mm（瞳孔間距離ベース）
             # MediaPipeの代表点: 左目外側(33)と右目外側(362)
             try:
-                left = landmarks.landmark[33]
-                right = landmarks.landmark[362]
-                lx, ly = left.x * width, left.y * height
-                rx, ry = right.x * width, right.y * height
-                ipd_px = float(np.hypot(lx - rx, ly - ry))
+                # 頂点は既にピクセル座標なので、XY差をスカラーで取り出して距離を計算
+                dx, dy = (vertices[33, :2] - vertices[362, :2]).tolist()
+                ipd_px = math.hypot(dx, dy)
                 ipd_mm = float(config.get_assumptions().get('ipd_mm_default', 63.0))
                 px_per_mm = ipd_px / max(1e-6, ipd_mm)
                 mesh.metadata['px_per_mm'] = px_per_mm
@@ -172,8 +333,13 @@ class FaceMeshProcessor:
             pass
         return mesh
     
-    def _generate_triangular_faces(self, vertices: np.ndarray) -> List[List[int]]:
-        """Delaunay三角分割を使用して面を生成"""
+    def _generate_triangular_faces(self, vertices: np.ndarray) -> np.ndarray:
+        """面を生成（MediaPipeのランドマークなら標準トポロジ、それ以外はDelaunay三角分割）"""
+        # MediaPipeのランドマーク（468点、refine_landmarks時は虹彩込みで478点）は
+        # トポロジが固定なので、三角分割せずに標準の面をそのまま使う
+        if len(vertices) in (_CANONICAL_VERTEX_COUNT, _CANONICAL_VERTEX_COUNT + 10):
+            return _CANONICAL_FACES
+        
         try:
             from scipy.spatial import Delaunay
             
@@ -183,15 +349,15 @@ class FaceMeshProcessor:
             # Delaunay三角分割
             tri = Delaunay(points_2d)
             
-            # 三角形の面を生成
-            faces = tri.simplices.tolist()
+            # 三角形の面を生成（Pythonのリストにせず int32 配列のまま返す）
+            faces = tri.simplices.astype(np.int32, copy=False)
             
             logger.info(f"Generated {len(faces)} triangular faces using Delaunay triangulation")
             return faces
             
         except ImportError:
             logger.warning("scipy not available, using simple face generation")
-            return self._generate_simple_faces(vertices)
+            return np.asarray(self._generate_simple_faces(vertices), dtype=np.int32).reshape(-1, 3)
     
     def _generate_simple_faces(self, vertices: np.ndarray) -> List[List[int]]:
         """簡易的な面を生成（Delaunay三角分割の代替）"""
@@ -232,7 +398,7 @@ class FaceMeshProcessor:
     
 
 
-    def visualize_mesh(self, mesh, canvas_size=(800, 600), draw_indices=True, use_faces=True, background_image: Optional[Image.Image]=None, alpha_wire=0.7, draw_points: bool = True):
+    def visualize_mesh(self, mesh, canvas_size=(800, 600), draw_indices=False, use_faces=True, background_image: Optional[Image.Image]=None, alpha_wire=0.7, draw_points: bool = True):
         """
         2D 正射影でワイヤーフレームを描く。
         - mesh.vertices: (N,3)
@@ -259,51 +425,47 @@ class FaceMeshProcessor:
 
         if background_image is not None:
             # OpenCVで背景に直接オーバーレイ（画像座標: 上=0, 左=0）
-            bg = background_image.convert('RGB')
+            # 背景はそのままのサイズで使うため、RGB変換（必要時のみ）と書き込み用の1回のコピーだけ行う
+            bg = background_image if background_image.mode == 'RGB' else background_image.convert('RGB')
             W, H = bg.size
-            img = np.array(bg.resize((W, H)))
+            img = np.array(bg)
 
             # メタデータの原画像サイズがあればスケール
             if not (img_w and img_h):
                 img_w, img_h = W, H
             scale_x = float(W) / float(img_w)
             scale_y = float(H) / float(img_h)
-            Xp = (x * scale_x).astype(np.int32)
-            Yp = (y * scale_y).astype(np.int32)
+            # 画像サイズはint16に収まるため、ピクセル座標は2バイトで保持（範囲外の頂点は飽和させる）
+            Xp = np.clip(x * scale_x, -32768, 32767).astype(np.int16)
+            Yp = np.clip(y * scale_y, -32768, 32767).astype(np.int16)
 
             # ワイヤー描画
-            line_color = (255, 127, 0)  # BGR: 青系より視認性の高い色
+            # imgはPIL由来のRGB配列のまま描画する（BGRへの変換はしない）ので、色もRGBで指定
+            line_color = (0, 127, 255)  # RGB: matplotlib描画と同系統の青
             alpha = max(0.1, min(1.0, float(alpha_wire)))
             thickness = 1
 
             try:
-                import cv2
-                img_draw = img.copy()
+                img_draw = self._overlay_buffer(img)
+                points = np.stack([Xp, Yp], axis=1)
+                n_points = len(points)
                 if use_faces and hasattr(mesh, 'faces') and mesh.faces is not None and len(mesh.faces) > 0:
-                    faces = np.asarray(mesh.faces, dtype=np.int32)
-                    for tri in faces:
-                        i, j, k = int(tri[0]), int(tri[1]), int(tri[2])
-                        if i < len(Xp) and j < len(Xp) and k < len(Xp):
-                            cv2.line(img_draw, (int(Xp[i]), int(Yp[i])), (int(Xp[j]), int(Yp[j])), line_color, thickness)
-                            cv2.line(img_draw, (int(Xp[j]), int(Yp[j])), (int(Xp[k]), int(Yp[k])), line_color, thickness)
-                            cv2.line(img_draw, (int(Xp[k]), int(Yp[k])), (int(Xp[i]), int(Yp[i])), line_color, thickness)
+                    # 隣接する三角形で共有される辺を二重に描かないよう、重複のない辺だけを描く
+                    edges = self._unique_edges(mesh)
                 else:
-                    try:
-                        from mediapipe.python.solutions.face_mesh_connections import FACEMESH_TESSELATION
-                        for (i, j) in FACEMESH_TESSELATION:
-                            if i < len(Xp) and j < len(Xp):
-                                cv2.line(img_draw, (int(Xp[i]), int(Yp[i])), (int(Xp[j]), int(Yp[j])), line_color, thickness)
-                    except Exception:
-                        pass
+                    edges = _TESS_EDGES
+                # 辺を (E,2,2) の線分としてまとめて1回で描画
+                edges = edges[(edges < n_points).all(axis=1)]
+                # OpenCVの点列はint32のみ受け付けるため、描画直前の (E,2,2) 配列でだけ変換
+                cv2.polylines(img_draw, points[edges].astype(np.int32, copy=False), False, line_color, thickness)
 
                 if draw_points:
-                    for xi, yi in zip(Xp, Yp):
-                        cv2.circle(img_draw, (int(xi), int(yi)), 1, (0, 200, 255), -1)
+                    _splat_points(img_draw, Xp, Yp, (0, 200, 255))
 
                 # 透明合成（ワイヤーを薄く）
-                img = cv2.addWeighted(img_draw, alpha, img, 1.0 - alpha, 0)
+                cv2.addWeighted(img_draw, alpha, img, 1.0 - alpha, 0, dst=img)
 
-                # インデックスは背景オーバーレイ時はデフォルト非表示（draw_indices=False推奨）
+                # インデックス表示はデバッグ用（draw_indices=Trueのときのみ1点ずつ描く）
                 if draw_indices:
                     for idx, (xi, yi) in enumerate(zip(Xp, Yp)):
                         cv2.putText(img, str(idx), (int(xi), int(yi)), cv2.FONT_HERSHEY_SIMPLEX, 0.25, (0, 0, 0), 1, cv2.LINE_AA)
@@ -348,14 +510,11 @@ class FaceMeshProcessor:
             triang = mtri.Triangulation(Xp, Yp, triangles=mesh.faces)
             ax.triplot(triang, linewidth=0.6, color=(0.0, 0.5, 1.0, alpha_wire))
         else:
-            # 既定の接続で線分を描く（MediaPipe の接続を利用）
-            try:
-                from mediapipe.python.solutions.face_mesh_connections import FACEMESH_TESSELATION
-                for (i, j) in FACEMESH_TESSELATION:
-                    ax.plot([Xp[i], Xp[j]], [Yp[i], Yp[j]], linewidth=0.3, color=(0.0, 0.5, 1.0, alpha_wire))
-            except Exception:
-                # 接続が無い場合は点だけ
-                pass
+            # 既定の接続で線分を描く（MediaPipe の接続を利用）。全辺を1つのLineCollectionにまとめる
+            edges = _TESS_EDGES[(_TESS_EDGES < len(Xp)).all(axis=1)]
+            if len(edges) > 0:
+                segments = np.stack([Xp, Yp], axis=1)[edges]  # (E,2,2)
+                ax.add_collection(LineCollection(segments, linewidths=0.3, colors=[(0.0, 0.5, 1.0, alpha_wire)]))
 
         # 点を薄く重ねる
         if draw_points:
@@ -366,13 +525,37 @@ class FaceMeshProcessor:
             for idx, (xx, yy) in enumerate(zip(Xp, Yp)):
                 ax.text(xx, yy, str(idx), fontsize=4)
 
-        # 画像として返す
-        buf = io.BytesIO()
+        # 画像として返す（PNGのエンコード/デコードを挟まず、描画済みのキャンバスバッファから直接作る）
         fig.canvas.draw()
-        fig.savefig(buf, format='png', pad_inches=0)
+        w, h = fig.canvas.get_width_height()
+        image = Image.frombuffer('RGBA', (w, h), fig.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).convert('RGB')
         plt.close(fig)
-        buf.seek(0)
-        return Image.open(buf)    
+        return image
+    
+    def _overlay_buffer(self, img: np.ndarray) -> np.ndarray:
+        """imgの内容をコピーした現在のスレッド用の作業バッファを返す（同じサイズなら再確保しない）"""
+        buffer = getattr(self._overlay_buffers, "buffer", None)
+        if buffer is None or buffer.shape != img.shape:
+            buffer = self._overlay_buffers.buffer = img.copy()
+        else:
+            np.copyto(buffer, img)
+        return buffer
+    
+    @staticmethod
+    def _unique_edges(mesh) -> np.ndarray:
+        """
+        メッシュの面から重複のない辺 (E,2) を取得
+        
+        trimeshのedges_uniqueは面が変わらない限りキャッシュされるため、
+        同じメッシュを繰り返し描画しても重複除去は1回で済む。
+        """
+        edges = getattr(mesh, 'edges_unique', None)
+        if edges is None:
+            faces = np.asarray(mesh.faces, dtype=np.int32)
+            edges = np.vstack([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+            edges.sort(axis=1)
+            edges = np.unique(edges, axis=0)
+        return np.asarray(edges, dtype=np.int32)
     
     def _create_simple_mesh_visualization(self, mesh: trimesh.Trimesh, image_size: Tuple[int, int]) -> Image.Image:
         """matplotlibがない場合の簡易メッシュ可視化"""
@@ -382,27 +565,20 @@ class FaceMeshProcessor:
         img = Image.new('RGB', (width, height), (255, 255, 255))
         
         # メッシュの頂点を2Dに投影
-        vertices = mesh.vertices
+        vertices_2d = np.asarray(mesh.vertices)[:, :2]
         
-        # 正規化（-1 to 1 の範囲）
-        vertices_2d = vertices[:, :2].copy()
-        vertices_2d[:, 0] = (vertices_2d[:, 0] - vertices_2d[:, 0].min()) / (vertices_2d[:, 0].max() - vertices_2d[:, 0].min()) * 2 - 1
-        vertices_2d[:, 1] = (vertices_2d[:, 1] - vertices_2d[:, 1].min()) / (vertices_2d[:, 1].max() - vertices_2d[:, 1].min()) * 2 - 1
-        
-        # 画像座標に変換
-        vertices_2d[:, 0] = (vertices_2d[:, 0] + 1) * width / 2
-        vertices_2d[:, 1] = (vertices_2d[:, 1] + 1) * height / 2
+        # バウンディングボックスで正規化して画像座標に変換（平行移動とスケールを1回の演算にまとめる）
+        vmin = vertices_2d.min(axis=0)
+        span = np.maximum(vertices_2d.max(axis=0) - vmin, 1e-8)
+        vertices_2d = (vertices_2d - vmin) * (np.array([width, height]) / span)
         
         # 簡易的な描画（OpenCVを使用）
         try:
-            import cv2
             img_array = np.array(img)
             
             # 各頂点を描画
-            for vertex in vertices_2d:
-                x, y = int(vertex[0]), int(vertex[1])
-                if 0 <= x < width and 0 <= y < height:
-                    cv2.circle(img_array, (x, y), 1, (0, 0, 255), -1)
+            points = vertices_2d.astype(np.int32)
+            _splat_points(img_array, points[:, 0], points[:, 1], (0, 0, 255))
             
             return Image.fromarray(img_array)
             
@@ -420,9 +596,12 @@ class FaceMeshProcessor:
         Returns:
             Dict: 顔の分析結果
         """
+        return await asyncio.to_thread(self.analyze_face_sync, pil_image)
+    
+    def analyze_face_sync(self, pil_image: Image.Image) -> Dict[str, Any]:
+        """analyze_faceの同期版（スレッドプールでの実行用）"""
         try:
-            cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-            results = self.face_mesh.process(cv_image)
+            results = self.process(_to_rgb_array(pil_image))
             
             if not results.multi_face_landmarks:
                 return {"error": "No face detected"}
@@ -3,8 +3,22 @@ from typing import Dict, List, Any, Optional, Tuple
 import logging
 from config import config
 
+# 複数キーワードの一括検索（未インストール時はキーワードごとの部分文字列検索）
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
+# 指示文の解析に使う正規表現・変換表（呼び出しごとのコンパイル/キャッシュ参照を避けるため事前に用意）
+_FULLWIDTH_DIGITS = str.maketrans('０１２３４５６７８９', '0123456789')
+_WS_RE = re.compile(r'\s+')
+# 大文字小文字の区別が意味を持つのは英字を含む mm（"MM"表記）のみ
+_MM_RE = re.compile(r'([+-]?\d+(?:\.\d+)?)\s*mm', re.IGNORECASE)
+_RATIO_RE = re.compile(r'([+-]?\d+(?:\.\d+)?)\s*%')
+_INTENSITY_RE = re.compile(r'強度\s*(\d+(?:\.\d+)?)|(\d+(?:\.\d+)?)\s*強度')
+
 class InstructionParser:
     """編集指示解析クラス"""
     
@@ -92,8 +106,44 @@ class InstructionParser:
             "極めて": 1.0
         }
         
+        # 部位ごとの最大変形量・変形パラメータは操作ごとに引き直さず、ここで一度だけ求めておく
+        known_targets = set(self.targets) | set(self.keyword_mapping.values())
+        self._max_delta = {target: config.get_max_delta(target) for target in known_targets}
+        self._params = {target: config.get_target_params(target) for target in known_targets}
+        self._delta_ranges = {target: config.get_delta_range(target) for target in known_targets}
+        
+        # 動作・強度キーワードは長いもの優先で照合する（同じ長さなら登録順）。
+        # 「少し」のような短い語が、より具体的な長い語より先に採用されないようにする
+        self._action_items = tuple(sorted(self.action_keywords.items(), key=lambda kv: -len(kv[0])))
+        self._intensity_items = tuple(sorted(self.intensity_keywords.items(), key=lambda kv: -len(kv[0])))
+        
+        # 部位・動作・強度の全キーワードを1回の走査で検出するオートマトン
+        self._keyword_automaton = self._build_keyword_automaton()
+        
         logger.info("InstructionParser initialized")
     
+    def _build_keyword_automaton(self):
+        """全キーワードを登録したAho-Corasickオートマトンを構築（ahocorasick未インストール時はNone）"""
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for keywords in (self.keyword_mapping, self.action_keywords, self.intensity_keywords):
+            for keyword in keywords:
+                automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        return automaton
+    
+    def _find_keywords(self, instruction: str) -> set:
+        """指示文に含まれるキーワードの集合を返す"""
+        if self._keyword_automaton is not None:
+            return {keyword for _, keyword in self._keyword_automaton.iter(instruction)}
+        return {
+            keyword
+            for keywords in (self.keyword_mapping, self.action_keywords, self.intensity_keywords)
+            for keyword in keywords
+            if keyword in instruction
+        }
+    
     def parse_instruction(self, instruction: str) -> List[Dict[str, Any]]:
         """
         編集指示を解析して構造化された操作リストに変換
@@ -129,10 +179,10 @@ class InstructionParser:
     def _normalize_instruction(self, instruction: str) -> str:
         """指示文を正規化"""
         # 全角数字を半角に変換
-        instruction = instruction.translate(str.maketrans('０１２３４５６７８９', '0123456789'))
+        instruction = instruction.translate(_FULLWIDTH_DIGITS)
         
         # 余分な空白を削除
-        instruction = re.sub(r'\s+', ' ', instruction.strip())
+        instruction = _WS_RE.sub(' ', instruction.strip())
         
         return instruction
     
@@ -140,15 +190,24 @@ class InstructionParser:
         """指示から編集操作を抽出"""
         operations = []
         
+        # 指示文を1回走査して、含まれるキーワードをまとめて検出
+        found = self._find_keywords(instruction)
+        if not found:
+            return operations
+        
+        # 動作・強度は長いキーワードから順に照合し、最初に見つかったものを採用
+        action_hit = next(
+            (action for keyword, action in self._action_items if keyword in found), None
+        )
+        intensity_hit = next(
+            (multiplier for keyword, multiplier in self._intensity_items if keyword in found), None
+        )
+        
         # 各部位キーワードをチェック
         for keyword, target in self.keyword_mapping.items():
-            if keyword in instruction:
-                # 対応する動作キーワードを探す
-                action_found = None
-                for action_keyword, (action_type, base_intensity) in self.action_keywords.items():
-                    if action_keyword in instruction:
-                        action_found = (action_type, base_intensity)
-                        break
+            if keyword in found:
+                # 対応する動作キーワード
+                action_found = action_hit
                 
                 # 動作キーワードが見つからない場合は、数値の符号から推測
                 if not action_found:
@@ -164,12 +223,8 @@ class InstructionParser:
                 if action_found:
                     action_type, base_intensity = action_found
                     
-                    # 強度キーワードをチェック
-                    intensity_multiplier = 1.0
-                    for intensity_keyword, multiplier in self.intensity_keywords.items():
-                        if intensity_keyword in instruction:
-                            intensity_multiplier = multiplier
-                            break
+                    # 強度キーワード
+                    intensity_multiplier = intensity_hit if intensity_hit is not None else 1.0
                     
                     # デフォルト変形量を計算
                     default_delta = self._get_default_delta(target, action_type)
@@ -191,16 +246,13 @@ class InstructionParser:
     def _extract_numerical_values(self, instruction: str, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """数値による変形量を抽出"""
         # mm単位の数値を抽出
-        mm_pattern = r'([+-]?\d+(?:\.\d+)?)\s*mm'
-        mm_matches = re.findall(mm_pattern, instruction, re.IGNORECASE)
+        mm_matches = _MM_RE.findall(instruction)
         
         # 比率の数値を抽出
-        ratio_pattern = r'([+-]?\d+(?:\.\d+)?)\s*%'
-        ratio_matches = re.findall(ratio_pattern, instruction, re.IGNORECASE)
+        ratio_matches = _RATIO_RE.findall(instruction)
         
         # 強度数値（0-10）を抽出
-        intensity_pattern = r'強度\s*(\d+(?:\.\d+)?)|(\d+(?:\.\d+)?)\s*強度'
-        intensity_matches = re.findall(intensity_pattern, instruction, re.IGNORECASE)
+        intensity_matches = _INTENSITY_RE.findall(instruction)
         
         # 数値マッチを統合
         all_numerical_values = []
@@ -224,6 +276,11 @@ class InstructionParser:
         
         return operations
     
+    def _get_max_delta(self, target: str) -> float:
+        """部位の最大変形量（初期化時に求めた値を使用）"""
+        max_delta = self._max_delta.get(target)
+        return max_delta if max_delta is not None else config.get_max_delta(target)
+    
     def _convert_value_to_delta(self, target: str, value: float, value_type: str) -> float:
         """数値を変形量に変換"""
         if value_type == "mm":
@@ -231,18 +288,18 @@ class InstructionParser:
             return value
         elif value_type == "ratio":
             # 比率値は最大変形量に適用
-            max_delta = config.get_max_delta(target)
+            max_delta = self._get_max_delta(target)
             return value * max_delta
         elif value_type == "intensity":
             # 強度値（0-1）は最大変形量に適用
-            max_delta = config.get_max_delta(target)
+            max_delta = self._get_max_delta(target)
             return value * max_delta
         else:
             return value
     
     def _get_default_delta(self, target: str, action_type: str) -> float:
         """デフォルト変形量を取得"""
-        max_delta = config.get_max_delta(target)
+        max_delta = self._get_max_delta(target)
         
         # 部位別のデフォルト変形量
         default_ratios = {
@@ -273,15 +330,21 @@ class InstructionParser:
             target = operation["target"]
             delta = operation["delta_mm"]
             
-            # 変形量の範囲チェック
-            if config.validate_delta(target, delta):
-                # パラメータを追加
+            # 変形量を有効範囲に収める（範囲外の操作は破棄せず境界値に丸める）
+            delta_range = self._delta_ranges.get(target)
+            min_delta, max_delta = delta_range if delta_range is not None else config.get_delta_range(target)
+            clamped = max(min_delta, min(max_delta, delta))
+            if clamped != delta:
+                logger.warning(f"Delta {delta} for target {target} clamped to {clamped}")
+                operation["delta_mm"] = clamped
+            
+            # パラメータを追加
+            params = self._params.get(target)
+            if params is None:
                 params = config.get_target_params(target)
-                operation.update(params)
-                
-                validated_operations.append(operation)
-            else:
-                logger.warning(f"Invalid delta {delta} for target {target}")
+            operation.update(params)
+            
+            validated_operations.append(operation)
         
         return validated_operations
     
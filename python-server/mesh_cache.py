@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+import trimesh
+
+logger = logging.getLogger(__name__)
+
+# /analyzeが発行するトークン（blake2b 8バイトの16進表記）。ファイル名に使うため形式を厳密に検証する
+_TOKEN_RE = re.compile(r"[0-9a-f]{16}")
+
+class MeshCache:
+    """/analyzeで構築したメッシュをトークンで保持するLRUキャッシュ
+
+    directoryを指定すると頂点・面・メタデータを<token>.npzとして保存し、同じホストの
+    別ワーカープロセスからもトークンで参照できる（Gunicorn等のマルチワーカー構成用）。
+    directoryは現在のユーザー所有・他ユーザーから読み書きできない（0o700）ことを要求する。
+    プロセス内のLRUは読み込み済みメッシュの再利用に使う。
+    エントリは最後に登録・参照されてからttl_sec秒で失効する。
+    get/putはディスクI/Oを伴うため、非同期ハンドラーからはスレッドプール経由で呼ぶこと。
+    """
+
+    def __init__(self, max_entries: int = 128, directory: Optional[str] = None, ttl_sec: float = 3600):
+        """
+        初期化
+
+        Args:
+            max_entries: 保持するメッシュの最大数（超えたら最も古いものから破棄）
+            directory: ワーカー間で共有する保存先ディレクトリ（省略時はプロセス内のみ）
+            ttl_sec: エントリの有効期限（秒）
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.ttl_sec = ttl_sec
+        # トークン → (メッシュ, 登録・参照時刻)
+        self._meshes: "OrderedDict[str, Tuple[trimesh.Trimesh, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if directory is not None:
+            self._prepare_directory(directory)
+
+        logger.info(f"MeshCache initialized (max_entries={max_entries}, directory={directory}, ttl_sec={ttl_sec})")
+
+    @staticmethod
+    def _prepare_directory(directory: str):
+        """保存先を0o700で作成し、他ユーザーが作成・書き込みできるディレクトリでないことを確認"""
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        st = os.stat(directory)
+        # 既存ディレクトリはmakedirsのmodeが効かないため、所有者と権限を明示的に検証する
+        if hasattr(os, "getuid") and st.st_uid != os.getuid():
+            raise PermissionError(f"Mesh cache directory {directory} is not owned by the current user")
+        if st.st_mode & 0o077:
+            raise PermissionError(f"Mesh cache directory {directory} must not be accessible by other users (mode 0o700)")
+
+    def put(self, token: str, mesh: trimesh.Trimesh):
+        """メッシュを登録"""
+        self._remember(token, mesh)
+        if self.directory is not None and _TOKEN_RE.fullmatch(token):
+            try:
+                self._write(token, mesh)
+                self._evict_files()
+            except OSError as e:
+                logger.warning(f"Failed to store mesh {token} to shared cache: {str(e)}")
+
+    def get(self, token: str) -> Optional[trimesh.Trimesh]:
+        """
+        メッシュを取得
+
+        キャッシュ上のメッシュは共有されるため、変形する場合は呼び出し側でコピーすること。
+
+        Returns:
+            trimesh.Trimesh: 登録済みのメッシュ（見つからない場合はNone）
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._meshes.get(token)
+            if entry is not None:
+                mesh, touched_at = entry
+                if now - touched_at <= self.ttl_sec:
+                    self._meshes[token] = (mesh, now)
+                    self._meshes.move_to_end(token)
+                    return mesh
+                del self._meshes[token]
+
+        # 他のワーカーが登録したメッシュは共有ディレクトリから読み込む
+        if self.directory is None or not _TOKEN_RE.fullmatch(token):
+            return None
+        mesh = self._read(token)
+        if mesh is not None:
+            self._remember(token, mesh)
+        return mesh
+
+    def _remember(self, token: str, mesh: trimesh.Trimesh):
+        """プロセス内のLRUに登録"""
+        with self._lock:
+            self._meshes[token] = (mesh, time.time())
+            self._meshes.move_to_end(token)
+            while len(self._meshes) > self.max_entries:
+                self._meshes.popitem(last=False)
+
+    def _path(self, token: str) -> str:
+        return os.path.join(self.directory, f"{token}.npz")
+
+    def _write(self, token: str, mesh: trimesh.Trimesh):
+        """一時ファイルに書いてからrenameし、読み込み側に書きかけのファイルを見せない"""
+        metadata = json.dumps(getattr(mesh, "metadata", None) or {}, default=str)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    vertices=np.asarray(mesh.vertices),
+                    faces=np.asarray(mesh.faces),
+                    metadata=np.array(metadata)
+                )
+            os.replace(tmp_path, self._path(token))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _read(self, token: str) -> Optional[trimesh.Trimesh]:
+        """共有ディレクトリからメッシュを復元（見つからない・壊れている場合はNone）"""
+        path = self._path(token)
+        try:
+            # 有効期限切れのファイルは読まずに削除
+            if time.time() - os.stat(path).st_mtime > self.ttl_sec:
+                os.unlink(path)
+                return None
+            with np.load(path, allow_pickle=False) as data:
+                vertices = data["vertices"]
+                faces = data["faces"]
+                metadata = json.loads(str(data["metadata"]))
+            # 参照されたエントリは破棄順で後回しにする
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to load mesh {token} from shared cache: {str(e)}")
+            return None
+
+        mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False, validate=False)
+        mesh.metadata.update(metadata)
+        return mesh
+
+    def _evict_files(self):
+        """有効期限切れのファイルを削除し、保存数がmax_entriesを超えたら更新時刻の古いファイルから削除"""
+        expire_before = time.time() - self.ttl_sec
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith((".npz", ".tmp")):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                    # 期限切れのエントリと、書き込み途中で残った一時ファイルを削除
+                    if mtime < expire_before:
+                        os.unlink(entry.path)
+                    elif entry.name.endswith(".npz"):
+                        entries.append((mtime, entry.path))
+                except FileNotFoundError:
+                    continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._meshes)
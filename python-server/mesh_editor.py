@@ -1,11 +1,46 @@
+import re
 import numpy as np
 import trimesh
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# プロンプト中の数字（強度）を探す正規表現
+_DIGITS_RE = re.compile(r'\d+')
+
+# プロンプト解析ルール: (編集操作名, 部位キーワード, 動作キーワード)
+_PROMPT_RULES = (
+    ("鼻を高く", "鼻", ("高く", "高")),
+    ("目を大きく", "目", ("大きく", "大")),
+    ("顎を細く", "顎", ("細く", "細")),
+    ("唇を厚く", "唇", ("厚く", "厚")),
+    ("頬を引き締める", "頬", ("引き締め",)),
+    ("額を広く", "額", ("広く", "広"))
+)
+
+# 全キーワードの選択パターン（長いものを優先）。1回のfindallでプロンプト中のキーワードをすべて拾う
+_PROMPT_KEYWORD_RE = re.compile("|".join(
+    re.escape(keyword)
+    for keyword in sorted(
+        {keyword for _, part, actions in _PROMPT_RULES for keyword in (part, *actions)},
+        key=len, reverse=True
+    )
+))
+
+# target → (部位名, 値1あたりの変位ベクトル, 値の絶対値を使うか)。target別の変形方向はこの表のみで定義
+_TARGET_DISPLACEMENTS = {
+    "nasal_tip_mm": ("nose_tip", (0, 0, 1), False),             # Z軸方向（前後）
+    "nasal_bridge_mm": ("nose_bridge", (0, 1, 0), False),
+    "eye_size_ratio": ("eyes", (1, 0, 0), False),               # 左右の目（左は+X、右は-X）
+    "jaw_width_mm": ("jaw_line", (1, 0, 0), False),
+    "lip_thickness_mm": ("mouth_outer", (0, 0, 1), False),      # Z軸方向
+    "cheek_contour_mm": ("cheeks", (1, 0, 0), False),           # 左右の頬（左は+X、右は-X）
+    "forehead_width_mm": ("forehead", (1, 0, 0), False),
+    "submental_fat_mm": ("submental", (0, -0.9, -3.0), True)    # 奥（Zマイナス）かつ少し上（Yマイナス）へ
+}
+
 class MeshEditor:
     def __init__(self):
         """3Dメッシュ編集クラス"""
@@ -22,94 +57,165 @@ class MeshEditor:
         # 顔の部位のランドマークインデックス（簡易版）
         self.face_regions = self._define_face_regions()
         
+        # 左右対称に逆向きへ動かす部位は、左右のインデックスと符号を連結して1回の更新で適用
+        self._symmetric_regions = {
+            "eyes": self._mirror_pair("left_eye", "right_eye"),
+            "cheeks": self._mirror_pair("left_cheek", "right_cheek")
+        }
+        
+        # 全部位のインデックスの上限（これ以上の頂点数ではクリップ結果が変わらないため、キャッシュのキーをここで頭打ちにする）
+        self._region_index_limit = max(int(indices.max()) for indices in self.face_regions.values()) + 1
+        
+        # (部位名, min(頂点数, 上限)) → 頂点数の範囲内に絞ったインデックス（と左右対称部位の符号）のキャッシュ
+        # 頂点数はクライアントが指定できるが、キーは部位数×上限で有界
+        self._clipped_regions: Dict[Tuple[str, int], Tuple[np.ndarray, Optional[np.ndarray]]] = {}
+        
         logger.info("MeshEditor initialized")
     
     def is_ready(self) -> bool:
         """エディターが準備完了かチェック"""
         return True
     
-    def _define_face_regions(self) -> Dict[str, list]:
-        """顔の部位のランドマークインデックスを定義"""
+    def _define_face_regions(self) -> Dict[str, np.ndarray]:
+        """顔の部位のランドマークインデックスを定義（頂点のファンシーインデックスにそのまま使えるint64配列）"""
         # MediaPipeの468個のランドマークから主要な部位を定義
         # 実際の実装では、より正確な部位定義を使用
-        return {
-            "nose_tip": list(range(1, 10)),           # 鼻先
-            "nose_bridge": list(range(168, 175)),     # 鼻筋
-            "left_eye": list(range(33, 42)),          # 左目
-            "right_eye": list(range(362, 373)),       # 右目
-            "left_eyebrow": list(range(70, 76)),      # 左眉毛
-            "right_eyebrow": list(range(300, 307)),   # 右眉毛
-            "mouth_outer": list(range(61, 84)),       # 口の外側
-            "mouth_inner": list(range(78, 95)),       # 口の内側
-            "jaw_line": list(range(172, 199)),        # 顎のライン
-            "left_cheek": list(range(116, 140)),      # 左頬
-            "right_cheek": list(range(345, 359)),     # 右頬
-            "forehead": list(range(10, 22)),          # 額
-            "chin": list(range(175, 185)),            # 顎先
-            "submental": list(range(200, 234))        # 顎下（簡易範囲）
+        regions = {
+            "nose_tip": range(1, 10),           # 鼻先
+            "nose_bridge": range(168, 175),     # 鼻筋
+            "left_eye": range(33, 42),          # 左目
+            "right_eye": range(362, 373),       # 右目
+            "left_eyebrow": range(70, 76),      # 左眉毛
+            "right_eyebrow": range(300, 307),   # 右眉毛
+            "mouth_outer": range(61, 84),       # 口の外側
+            "mouth_inner": range(78, 95),       # 口の内側
+            "jaw_line": range(172, 199),        # 顎のライン
+            "left_cheek": range(116, 140),      # 左頬
+            "right_cheek": range(345, 359),     # 右頬
+            "forehead": range(10, 22),          # 額
+            "chin": range(175, 185),            # 顎先
+            "submental": range(200, 234)        # 顎下（簡易範囲）
         }
+        return {name: np.arange(r.start, r.stop, dtype=np.int64) for name, r in regions.items()}
+    
+    def _mirror_pair(self, left_region: str, right_region: str):
+        """左右の部位を連結したインデックスと、左を+1・右を-1とする符号 (K,1) を返す"""
+        left = self.face_regions[left_region]
+        right = self.face_regions[right_region]
+        signs = np.concatenate([np.ones(len(left)), -np.ones(len(right))])[:, None]
+        return np.concatenate([left, right]), signs
     
-    async def edit_mesh(self, mesh: trimesh.Trimesh, operations: list) -> trimesh.Trimesh:
+    async def edit_mesh_batch(self, mesh: trimesh.Trimesh, operations: list, params: Optional[Dict[str, Any]] = None) -> trimesh.Trimesh:
         """
-        編集操作のリストに基づいてメッシュを編集
+        編集操作のリストを1回の変位計算にまとめてメッシュへ適用（メッシュをその場で更新）
         
         Args:
-            mesh: 元の3Dメッシュ
+            mesh: 3Dメッシュ（頂点はこの関数内で直接書き換えられる）
             operations: 編集操作のリスト [{"target": "nasal_tip_mm", "action": "increase", "value": 1.8}]
+            params: 操作に値がない場合に使うtarget別の既定値（省略可）
             
         Returns:
-            trimesh.Trimesh: 編集された3Dメッシュ
+            trimesh.Trimesh: 編集された3Dメッシュ（引数と同じオブジェクト）
         """
+        return self.edit_mesh_batch_sync(mesh, operations, params)
+    
+    def edit_mesh_batch_sync(self, mesh: trimesh.Trimesh, operations: list, params: Optional[Dict[str, Any]] = None) -> trimesh.Trimesh:
+        """edit_mesh_batchの同期版（スレッドプールでの実行用）"""
         try:
-            # メッシュのコピーを作成
-            edited_mesh = mesh.copy()
+            params = params or {}
+            vertex_count = len(mesh.vertices)
+            displacement = np.zeros((vertex_count, 3), dtype=np.float32)
             
-            # 各操作を順次適用
+            # 全操作を (頂点インデックスの連結配列, 部位ごとの変位ベクトル, 部位ごとの頂点数, 頂点ごとの符号) にまとめる
+            index_chunks = []
+            vectors = []
+            counts = []
+            sign_chunks = []
+            has_signs = False
             for operation in operations:
-                edited_mesh = self._apply_operation(edited_mesh, operation)
-                logger.info(f"Applied operation: {operation}")
+                target = operation.get("target")
+                value = operation.get("delta_mm", operation.get("value", params.get(target, 0)))
+                value = self._clamp_value(target, value)
+                
+                region_displacements = self._region_displacements(target, value)
+                if region_displacements is None:
+                    logger.warning(f"Unknown target: {target}")
+                    continue
+                
+                for region_name, vector in region_displacements:
+                    clipped = self._clipped_region(region_name, vertex_count)
+                    if clipped is None:
+                        continue
+                    indices, signs = clipped
+                    if indices.size:
+                        index_chunks.append(indices)
+                        vectors.append(vector)
+                        counts.append(indices.size)
+                        # 左右対称部位は右側の変位を反転（それ以外の部位は符号1）
+                        if signs is None:
+                            sign_chunks.append(np.ones((indices.size, 1)))
+                        else:
+                            sign_chunks.append(signs)
+                            has_signs = True
             
-            return edited_mesh
+            # 全操作の変位を1回の散布加算でバッファに集計（部位の重なりはnp.add.atで正しく加算される）
+            if index_chunks:
+                # 変形強度を1/10に調整（_deform_regionと同じ係数）
+                per_vertex = np.repeat(np.asarray(vectors, dtype=np.float32) * 0.1, counts, axis=0)
+                if has_signs:
+                    per_vertex *= np.concatenate(sign_chunks)
+                np.add.at(displacement, np.concatenate(index_chunks), per_vertex)
             
-        except Exception as e:
-            logger.error(f"Error editing mesh: {str(e)}")
-            return mesh
-    
-    def _apply_operation(self, mesh: trimesh.Trimesh, operation: dict) -> trimesh.Trimesh:
-        """個別の操作を適用"""
-        try:
-            target = operation.get("target")
-            action = operation.get("action_type", operation.get("action"))
-            value = operation.get("delta_mm", operation.get("value", 0))
+            # 頂点の更新は1回だけ
+            mesh.vertices += displacement
             
-            # 現実的な範囲に制限
-            value = self._clamp_value(target, value)
+            changed = int(np.count_nonzero(displacement.any(axis=1)))
+            logger.info(f"Applied {len(operations)} operations in one pass: changed {changed} vertices")
             
-            logger.info(f"Applying operation: target={target}, action={action}, value={value}")
+            return mesh
             
-            if target == "nasal_tip_mm":
-                return self._deform_nose_tip(mesh, value)
-            elif target == "nasal_bridge_mm":
-                return self._deform_nose_bridge(mesh, value)
-            elif target == "eye_size_ratio":
-                return self._deform_eye_size(mesh, value)
-            elif target == "jaw_width_mm":
-                return self._deform_jaw_width(mesh, value)
-            elif target == "lip_thickness_mm":
-                return self._deform_lip_thickness(mesh, value)
-            elif target == "cheek_contour_mm":
-                return self._deform_cheek_contour(mesh, value)
-            elif target == "forehead_width_mm":
-                return self._deform_forehead_width(mesh, value)
-            elif target == "submental_fat_mm":
-                return self._deform_submental_fat(mesh, value)
-            else:
-                logger.warning(f"Unknown target: {target}")
-                return mesh
         except Exception as e:
-            logger.error(f"Error applying operation {operation}: {str(e)}")
+            logger.error(f"Error editing mesh (batch): {str(e)}")
             return mesh
     
+    def _region_displacements(self, target: str, value: float) -> Optional[list]:
+        """targetごとの (部位名, 変位ベクトル) のリストを返す（未知のtargetはNone）"""
+        entry = _TARGET_DISPLACEMENTS.get(target)
+        if entry is None:
+            return None
+        region_name, direction, use_abs = entry
+        scale = abs(value) if use_abs else value
+        return [(region_name, [component * scale for component in direction])]
+    
+    def _clipped_region(self, region_name: str, vertex_count: int) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """
+        部位のインデックスを頂点数の範囲内に絞って返す（部位名と頂点数ごとにキャッシュ。頂点数は上限で頭打ち）
+        
+        Returns:
+            (インデックス, 符号) のタプル。符号は左右対称部位のときのみ (K,1) 配列、それ以外はNone。
+            未定義の部位はNone。
+        """
+        vertex_count = min(vertex_count, self._region_index_limit)
+        key = (region_name, vertex_count)
+        clipped = self._clipped_regions.get(key)
+        if clipped is None:
+            if region_name in self._symmetric_regions:
+                indices, signs = self._symmetric_regions[region_name]
+            else:
+                indices, signs = self.face_regions.get(region_name), None
+                if indices is None:
+                    return None
+            in_range = indices < vertex_count
+            clipped = (indices[in_range], None if signs is None else signs[in_range])
+            self._clipped_regions[key] = clipped
+        return clipped
+    
+    def _region_index_array(self, region_name: str, vertex_count: int) -> np.ndarray:
+        """部位のランドマークインデックスを頂点数の範囲内に絞ったnumpy配列で返す"""
+        clipped = self._clipped_region(region_name, vertex_count)
+        if clipped is None:
+            return np.empty(0, dtype=np.int64)
+        return clipped[0]
     
     def _clamp_value(self, target: str, value: float) -> float:
         """現実的な範囲に値を制限"""
@@ -146,27 +252,17 @@ class MeshEditor:
         """
         operations = {}
         
-        # 日本語の美容整形関連キーワードを検出
-        prompt_lower = prompt.lower()
-        
-        # 各編集操作のキーワードをチェック
-        if "鼻" in prompt_lower and ("高く" in prompt_lower or "高" in prompt_lower):
-            operations["鼻を高く"] = self._extract_intensity(prompt, "鼻")
-        
-        if "目" in prompt_lower and ("大きく" in prompt_lower or "大" in prompt_lower):
-            operations["目を大きく"] = self._extract_intensity(prompt, "目")
-        
-        if "顎" in prompt_lower and ("細く" in prompt_lower or "細" in prompt_lower):
-            operations["顎を細く"] = self._extract_intensity(prompt, "顎")
+        # プロンプトを1回走査して含まれるキーワードを集める
+        # （キーワードは日本語のみで大文字小文字の区別がないため、lower()は不要）
+        hits = set(_PROMPT_KEYWORD_RE.findall(prompt))
         
-        if "唇" in prompt_lower and ("厚く" in prompt_lower or "厚" in prompt_lower):
-            operations["唇を厚く"] = self._extract_intensity(prompt, "唇")
-        
-        if "頬" in prompt_lower and ("引き締め" in prompt_lower):
-            operations["頬を引き締める"] = self._extract_intensity(prompt, "頬")
-        
-        if "額" in prompt_lower and ("広く" in prompt_lower or "広" in prompt_lower):
-            operations["額を広く"] = self._extract_intensity(prompt, "額")
+        # 各編集操作のキーワードをチェック（強度はプロンプト全体から決まるので1回だけ抽出）
+        intensity = None
+        for operation_name, part, actions in _PROMPT_RULES:
+            if part in hits and any(action in hits for action in actions):
+                if intensity is None:
+                    intensity = self._extract_intensity(prompt, part)
+                operations[operation_name] = intensity
         
         return operations
     
@@ -182,8 +278,7 @@ class MeshEditor:
             float: 強度（0-1の範囲）
         """
         # 数字を探す（簡易版）
-        import re
-        numbers = re.findall(r'\d+', prompt)
+        numbers = _DIGITS_RE.findall(prompt)
         
         if numbers:
             # 最初に見つかった数字を使用
@@ -198,44 +293,6 @@ class MeshEditor:
         else:
             return 0.5  # デフォルト強度
     
-    def _deform_nose_tip(self, mesh: trimesh.Trimesh, value: float) -> trimesh.Trimesh:
-        """鼻尖を変形"""
-        return self._deform_region(mesh, "nose_tip", [0, 0, value])  # Z軸方向（前後）に変形
-    
-    def _deform_nose_bridge(self, mesh: trimesh.Trimesh, value: float) -> trimesh.Trimesh:
-        """鼻筋を変形"""
-        return self._deform_region(mesh, "nose_bridge", [0, value, 0])
-    
-    def _deform_eye_size(self, mesh: trimesh.Trimesh, value: float) -> trimesh.Trimesh:
-        """目のサイズを変形（スケール）"""
-        # 両目を中心から外側に拡張
-        left_eye_mesh = self._deform_region(mesh, "left_eye", [value, 0, 0])
-        return self._deform_region(left_eye_mesh, "right_eye", [-value, 0, 0])
-    
-    def _deform_jaw_width(self, mesh: trimesh.Trimesh, value: float) -> trimesh.Trimesh:
-        """顎の幅を変形"""
-        return self._deform_region(mesh, "jaw_line", [value, 0, 0])
-    
-    def _deform_lip_thickness(self, mesh: trimesh.Trimesh, value: float) -> trimesh.Trimesh:
-        """唇の厚さを変形"""
-        return self._deform_region(mesh, "mouth_outer", [0, 0, value])  # Z軸方向に変形
-    
-    def _deform_cheek_contour(self, mesh: trimesh.Trimesh, value: float) -> trimesh.Trimesh:
-        """頬の輪郭を変形"""
-        left_cheek = self._deform_region(mesh, "left_cheek", [value, 0, 0])
-        return self._deform_region(left_cheek, "right_cheek", [-value, 0, 0])
-    
-    def _deform_forehead_width(self, mesh: trimesh.Trimesh, value: float) -> trimesh.Trimesh:
-        """額の幅を変形"""
-        return self._deform_region(mesh, "forehead", [value, 0, 0])
-    
-    def _deform_submental_fat(self, mesh: trimesh.Trimesh, value: float) -> trimesh.Trimesh:
-        """顎下脂肪吸引: 顎下領域を内側（奥/Zマイナス）かつ少し上(Yマイナス)へ"""
-        # Z方向を主、Y方向は弱めに（自然に）
-        dz = -abs(value) * 3.0      # 可視化強調: 奥行きを強めに
-        dy = -abs(value) * 0.9      # 上方向も強めに
-        return self._deform_region(mesh, "submental", [0, dy, dz])
-
     def _edit_submental_fat(self, mesh: trimesh.Trimesh, intensity: float) -> trimesh.Trimesh:
         """テキスト編集版：顎下脂肪を軽減"""
         dz = -0.6 * intensity       # 可視化強調
@@ -243,30 +300,31 @@ class MeshEditor:
         return self._deform_region(mesh, "submental", [0, dy, dz])
 
     def _deform_region(self, mesh: trimesh.Trimesh, region_name: str, displacement: list) -> trimesh.Trimesh:
-        """指定された部位を変形"""
+        """
+        指定された部位を変形（メッシュの頂点をその場で更新）
+        
+        region_nameに左右対称の部位（"eyes", "cheeks"）を指定した場合、右側には逆向きの変位を適用する。
+        """
         try:
-            # 変形対象の頂点インデックスを取得
-            region_indices = self.face_regions.get(region_name, [])
+            # 変形対象の頂点インデックス（メッシュの頂点数を超えないよう絞り込み済み）を取得
+            clipped = self._clipped_region(region_name, len(mesh.vertices))
             
-            if not region_indices:
+            if clipped is None:
                 logger.warning(f"Region {region_name} not found")
                 return mesh
             
-            # メッシュをコピー
-            deformed_mesh = mesh.copy()
-            
-            # 変形を適用
+            # 変形を適用（メッシュの頂点をその場で更新）
             displacement_vector = np.array(displacement)
+            valid_indices, signs = clipped
             
-            # インデックスがメッシュの頂点数を超えていないかチェック
-            valid_indices = [idx for idx in region_indices if idx < len(deformed_mesh.vertices)]
-            
-            if valid_indices:
+            if len(valid_indices) > 0:
                 # 頂点を変形（変形強度を調整）
                 scaled_displacement = displacement_vector * 0.1  # 変形強度を1/10に調整
-                before_positions = deformed_mesh.vertices[valid_indices].copy()
+                if signs is not None:
+                    scaled_displacement = signs * scaled_displacement
+                before_positions = mesh.vertices[valid_indices].copy()
                 after_positions = before_positions + scaled_displacement
-                deformed_mesh.vertices[valid_indices] = after_positions
+                mesh.vertices[valid_indices] = after_positions
 
                 # 差分ログ（概要）
                 deltas = after_positions - before_positions
@@ -281,7 +339,7 @@ class MeshEditor:
                     top_k = 20
                     sort_idx = np.argsort(-magnitudes)[:top_k]
                     for local_i in sort_idx:
-                        v_idx = valid_indices[local_i]
+                        v_idx = int(valid_indices[local_i])
                         b = before_positions[local_i]
                         a = after_positions[local_i]
                         d = deltas[local_i]
@@ -298,7 +356,7 @@ class MeshEditor:
             else:
                 logger.warning(f"No valid vertices found for region {region_name}")
             
-            return deformed_mesh
+            return mesh
             
         except Exception as e:
             logger.error(f"Error deforming region {region_name}: {str(e)}")
@@ -311,9 +369,7 @@ class MeshEditor:
         
         # Z軸方向に移動（高くする）
         displacement = intensity * 0.1  # 強度に応じた移動量
-        
-        for vertex_idx in nose_vertices:
-            mesh.vertices[vertex_idx, 2] += displacement  # Z軸方向
+        mesh.vertices[nose_vertices, 2] += displacement
         
         return mesh
     
@@ -327,13 +383,11 @@ class MeshEditor:
         scale_factor = 1.0 + intensity * 0.2
         
         for eye_vertices in [left_eye, right_eye]:
-            if eye_vertices:
-                center = mesh.vertices[eye_vertices].mean(axis=0)
-                for vertex_idx in eye_vertices:
-                    # 中心からの相対位置を計算
-                    relative_pos = mesh.vertices[vertex_idx] - center
-                    # スケール適用
-                    mesh.vertices[vertex_idx] = center + relative_pos * scale_factor
+            if len(eye_vertices) > 0:
+                # 中心からの相対位置をまとめてスケール
+                points = mesh.vertices[eye_vertices]
+                center = points.mean(axis=0)
+                mesh.vertices[eye_vertices] = center + (points - center) * scale_factor
         
         return mesh
     
@@ -345,10 +399,9 @@ class MeshEditor:
         # 中心軸からの距離を縮小
         center_x = mesh.vertices[:, 0].mean()
         
-        for vertex_idx in jaw_vertices:
-            # X軸方向の距離を縮小
-            relative_x = mesh.vertices[vertex_idx, 0] - center_x
-            mesh.vertices[vertex_idx, 0] = center_x + relative_x * (1.0 - intensity * 0.3)
+        # X軸方向の距離を縮小
+        relative_x = mesh.vertices[jaw_vertices, 0] - center_x
+        mesh.vertices[jaw_vertices, 0] = center_x + relative_x * (1.0 - intensity * 0.3)
         
         return mesh
     
@@ -360,31 +413,27 @@ class MeshEditor:
         # 唇の厚みを増加（法線方向に移動）
         displacement = intensity * 0.05
         
-        for vertex_idx in mouth_vertices:
-            # 簡易的にY軸方向に移動（実際は法線計算が必要）
-            mesh.vertices[vertex_idx, 1] += displacement
+        # 簡易的にY軸方向に移動（実際は法線計算が必要）
+        mesh.vertices[mouth_vertices, 1] += displacement
         
         return mesh
     
     def _edit_cheek_contour(self, mesh: trimesh.Trimesh, intensity: float) -> trimesh.Trimesh:
         """頬を引き締める編集"""
-        # 頬の部位の頂点を取得
-        left_cheek = self._get_region_vertices(mesh, "left_cheek")
-        right_cheek = self._get_region_vertices(mesh, "right_cheek")
+        # 頬の部位の頂点を取得（左右まとめて処理）
+        cheek_vertices = self._get_region_vertices(mesh, "left_cheek", "right_cheek")
         
         # 頬を内側に移動
         displacement = intensity * 0.08
         
-        for cheek_vertices in [left_cheek, right_cheek]:
-            for vertex_idx in cheek_vertices:
-                # 中心に向かって移動
-                center = mesh.vertices[vertex_idx].copy()
-                center[0] = 0  # X軸中心
-                direction = center - mesh.vertices[vertex_idx]
-                direction[0] = 0  # Y軸方向のみ
-                if np.linalg.norm(direction) > 0:
-                    direction = direction / np.linalg.norm(direction)
-                    mesh.vertices[vertex_idx] += direction * displacement
+        if len(cheek_vertices) > 0:
+            # 顔の中心軸（X）に向かう単位ベクトルをまとめて計算（中心上の頂点はゼロ除算せず移動なし）
+            center_x = mesh.vertices[:, 0].mean()
+            points = mesh.vertices[cheek_vertices]
+            direction = np.zeros_like(points)
+            direction[:, 0] = center_x - points[:, 0]
+            direction /= np.maximum(np.linalg.norm(direction, axis=1, keepdims=True), 1e-12)
+            mesh.vertices[cheek_vertices] = points + direction * displacement
         
         return mesh
     
@@ -395,15 +444,13 @@ class MeshEditor:
         
         # 額を左右に拡張
         scale_factor = 1.0 + intensity * 0.15
-        center_x = mesh.vertices[forehead_vertices, 0].mean()
-        
-        for vertex_idx in forehead_vertices:
-            relative_x = mesh.vertices[vertex_idx, 0] - center_x
-            mesh.vertices[vertex_idx, 0] = center_x + relative_x * scale_factor
+        forehead_x = mesh.vertices[forehead_vertices, 0]
+        center_x = forehead_x.mean()
+        mesh.vertices[forehead_vertices, 0] = center_x + (forehead_x - center_x) * scale_factor
         
         return mesh
     
-    def _get_region_vertices(self, mesh: trimesh.Trimesh, *region_names: str) -> list:
+    def _get_region_vertices(self, mesh: trimesh.Trimesh, *region_names: str) -> np.ndarray:
         """
         指定された部位の頂点インデックスを取得
         
@@ -412,18 +459,18 @@ class MeshEditor:
             region_names: 部位名
             
         Returns:
-            list: 頂点インデックスのリスト
+            np.ndarray: 重複のない頂点インデックスのint64配列（ファンシーインデックスにそのまま使用可能）
         """
-        vertices = []
-        for region_name in region_names:
-            if region_name in self.face_regions:
-                # 実際の実装では、ランドマークインデックスと頂点インデックスの
-                # マッピングが必要（ここでは簡易的に実装）
-                region_indices = self.face_regions[region_name]
-                
-                # メッシュの頂点数を超えないように調整
-                valid_indices = [idx for idx in region_indices if idx < len(mesh.vertices)]
-                vertices.extend(valid_indices)
-        
-        return list(set(vertices))  # 重複を除去
+        # 実際の実装では、ランドマークインデックスと頂点インデックスの
+        # マッピングが必要（ここでは簡易的に実装）
+        # メッシュの頂点数を超えないように調整したインデックスを連結
+        vertex_count = len(mesh.vertices)
+        chunks = [
+            self._region_index_array(region_name, vertex_count)
+            for region_name in region_names
+            if region_name in self.face_regions
+        ]
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(chunks))  # 重複を除去
 
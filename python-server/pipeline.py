@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, BinaryIO, Callable, Dict, Optional
+
+from PIL import Image
+
+from face_mesh import FaceMeshProcessor
+from mesh_editor import MeshEditor
+from instruction_parser import InstructionParser
+
+logger = logging.getLogger(__name__)
+
+class FaceMeshPipeline:
+    """/process-face-mesh用の一括処理パイプライン（デコード〜メッシュ編集を1回のスレッドプール呼び出しで実行）"""
+
+    def __init__(
+        self,
+        face_processor: FaceMeshProcessor,
+        mesh_editor: MeshEditor,
+        instruction_parser: InstructionParser,
+        nano_processor: Any,
+        decode_image: Callable[[BinaryIO], Image.Image],
+        executor: Optional[Executor] = None,
+        limiter: Optional[Any] = None
+    ):
+        """
+        初期化
+
+        Args:
+            face_processor: メッシュ構築に使うFaceMeshProcessor
+            mesh_editor: メッシュ編集に使うMeshEditor
+            instruction_parser: プロンプト解析に使うInstructionParser
+            nano_processor: 画像生成に使うNanoBananaProcessor
+            decode_image: アップロード画像をPIL画像へデコードする関数
+            executor: 同期処理を実行するExecutor（省略時はイベントループ既定）
+            limiter: 推論の同時実行数を制限する非同期コンテキストマネージャ（anyio.Semaphore等、省略可）
+        """
+        self.face_processor = face_processor
+        self.mesh_editor = mesh_editor
+        self.instruction_parser = instruction_parser
+        self.nano_processor = nano_processor
+        self.decode_image = decode_image
+        self.executor = executor
+        self.limiter = limiter
+
+    async def run(self, image_file: BinaryIO, prompt: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        画像とプロンプトから編集後の画像を生成
+
+        Args:
+            image_file: アップロード画像のファイルオブジェクト
+            prompt: 編集指示のプロンプト
+            params: target別の既定値（操作に値がない場合に使用）
+
+        Returns:
+            Dict: image（生成画像）, original_size, mesh_vertices, operations（顔が検出できない場合はNone）
+        """
+        loop = asyncio.get_running_loop()
+        if self.limiter is not None:
+            async with self.limiter:
+                built = await loop.run_in_executor(
+                    self.executor, self._build_and_edit, image_file, prompt, params
+                )
+        else:
+            built = await loop.run_in_executor(
+                self.executor, self._build_and_edit, image_file, prompt, params
+            )
+        if built is None:
+            return None
+        pil_image, edited_mesh, operations = built
+
+        logger.info("Generating final image...")
+        result_image = await self.nano_processor.generate_image(edited_mesh, pil_image)
+
+        return {
+            "image": result_image,
+            # 縮小デコード前の元画像サイズ（メッシュ頂点はこのピクセル座標）
+            "original_size": pil_image.info.get("original_size", pil_image.size),
+            "mesh_vertices": len(edited_mesh.vertices),
+            "operations": operations
+        }
+
+    def _build_and_edit(self, image_file: BinaryIO, prompt: str, params: Optional[Dict[str, Any]]):
+        """デコード・メッシュ構築・プロンプト解析・メッシュ編集をまとめて実行（同期版）"""
+        pil_image = self.decode_image(image_file)
+
+        face_mesh = self.face_processor.build_mesh_sync(pil_image)
+        if not face_mesh:
+            return None
+
+        operations = self.instruction_parser.parse_instruction(prompt)
+        edited_mesh = self.mesh_editor.edit_mesh_batch_sync(face_mesh, operations, params)
+
+        return pil_image, edited_mesh, operations
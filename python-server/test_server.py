@@ -1,17 +1,34 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
+import atexit
+import functools
 import json
-from typing import Dict, Any, List
+import orjson
+import os
+from typing import Any, List, Tuple
+from pydantic import BaseModel, ValidationError
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 # カスタムモジュール（MediaPipeなしでテスト）
 from config import config, Config
 from instruction_parser import InstructionParser
 
-# ログ設定
-logging.basicConfig(level=logging.INFO)
+# ログ設定（リクエスト処理中はキューに積むだけにし、整形と出力はリスナースレッドで行う）
+_log_queue = queue.SimpleQueue()
+_log_queue_handler = QueueHandler(_log_queue)
+# QueueHandlerはキュー投入時にメッセージを確定させるため、書式はリスナー側だけで付ける
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+logging.basicConfig(level=logging.INFO, handlers=[_log_queue_handler])
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # FastAPIアプリケーション初期化
@@ -20,7 +37,8 @@ app = FastAPI(
     version=config.get("version", "0.1.0"),
     description="美容整形シミュレーションMVP - テストサーバー",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS設定
@@ -29,119 +47,174 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # 明示リストにしてプリフライト応答ヘッダーを固定文字列にする
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type"],
 )
 
+# レスポンス圧縮（操作ごとに同じキーが繰り返されるJSONはよく縮む）
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=config.get("api.compress_min_size", 512),
+    compresslevel=5
+)
+
+class ParseReq(BaseModel):
+    """/edit/parse のリクエストボディ"""
+    instruction: str = ""
+
 # テスト用のプロセッサー
 instruction_parser = InstructionParser()
 
+@functools.lru_cache(maxsize=1024)
+def _parse_cached(instruction: str) -> tuple:
+    """指示文の解析結果（同じ指示文はキャッシュから返す。結果は共有されるため変更しないこと）"""
+    return tuple(instruction_parser.parse_instruction(instruction))
+
+# 実行中に変化しない設定値は起動時にモジュール変数へ束縛しておく
+_APP_NAME = config.get("app_name")
+_VERSION = config.get("version")
+_TARGETS = config.get_targets()
+_SUPPORTED = tuple(instruction_parser.get_supported_targets())
+_EXAMPLES = instruction_parser.parse_examples()
+_KEYWORDS = instruction_parser.get_target_keywords()
+# 部位ごとの変形量の範囲 (最小, 最大)
+_DELTA_LIMITS = {target: config.get_delta_range(target) for target in _SUPPORTED}
+
+# 実行中に変化しないレスポンスは起動時に一度だけシリアライズしておく
+_ROOT_BYTES = orjson.dumps({"message": "CosmeticSim-MVP Test Server", "status": "running", "version": _VERSION})
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "processors": {
+        "instruction_parser": True,
+        "face_mesh": False,  # テスト用なので無効
+        "mesh_editor": False,
+        "nano_banana": False
+    },
+    "config": {
+        "targets": _TARGETS,
+        "app_name": _APP_NAME,
+        "supported_targets": _SUPPORTED
+    }
+})
+_TARGETS_BYTES = orjson.dumps({
+    "targets": _SUPPORTED,
+    "keywords": _KEYWORDS,
+    "examples": _EXAMPLES
+})
+_CONFIG_BYTES = orjson.dumps({
+    "app_name": _APP_NAME,
+    "version": _VERSION,
+    "targets": _TARGETS,
+    "assumptions": config.get_assumptions(),
+    "limits": config.get_limits()
+})
+
 @app.get("/")
 async def root():
-    return {"message": "CosmeticSim-MVP Test Server", "status": "running", "version": config.get("version")}
+    return Response(_ROOT_BYTES, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
     """ヘルスチェックエンドポイント"""
-    try:
-        return {
-            "status": "healthy",
-            "processors": {
-                "instruction_parser": True,
-                "face_mesh": False,  # テスト用なので無効
-                "mesh_editor": False,
-                "nano_banana": False
-            },
-            "config": {
-                "targets": config.get_targets(),
-                "app_name": config.get("app_name"),
-                "supported_targets": instruction_parser.get_supported_targets()
-            }
-        }
-    except Exception as e:
-        logger.error(f"Health check error: {str(e)}")
-        return {"status": "unhealthy", "error": str(e)}
+    return Response(_HEALTH_BYTES, media_type="application/json")
 
 @app.post("/edit/parse")
-async def parse_edit_instruction(request: Dict[str, str]):
+async def parse_edit_instruction(request: Request):
     """テキスト指示を正規化（テスト用）"""
+    # ボディのバイト列をpydantic-core（Rust）でJSONデコードと型検証まで一度に行う
+    try:
+        req = ParseReq.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {str(e)}")
+    
     try:
-        instruction = request.get("instruction", "")
-        logger.info(f"Parsing instruction: {instruction}")
+        instruction = req.instruction
+        logger.info("Parsing instruction: %s", instruction)
         
-        operations = instruction_parser.parse_instruction(instruction)
+        operations = _parse_cached(instruction)
         
-        return JSONResponse({
+        # dictを返すとjsonable_encoderで全体を走査し直すため、Responseを直接返す
+        return ORJSONResponse({
             "instruction": instruction,
             "ops": operations,
-            "supported_targets": instruction_parser.get_supported_targets(),
-            "examples": instruction_parser.parse_examples()
+            "supported_targets": _SUPPORTED,
+            "examples": _EXAMPLES
         })
         
     except Exception as e:
-        logger.error(f"Error parsing instruction: {str(e)}")
+        logger.error("Error parsing instruction: %s", e)
         raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
 
 @app.get("/targets")
 async def get_supported_targets():
     """サポートされている対象部位を取得"""
-    return {
-        "targets": instruction_parser.get_supported_targets(),
-        "keywords": instruction_parser.get_target_keywords(),
-        "examples": instruction_parser.parse_examples()
-    }
+    return Response(_TARGETS_BYTES, media_type="application/json")
 
 @app.get("/config")
 async def get_config():
     """設定情報を取得"""
-    return {
-        "app_name": config.get("app_name"),
-        "version": config.get("version"),
-        "targets": config.get_targets(),
-        "assumptions": config.get_assumptions(),
-        "limits": config.get_limits()
-    }
+    return Response(_CONFIG_BYTES, media_type="application/json")
+
+def _delta_range(target: str) -> Tuple[float, float]:
+    """部位の変形量の範囲 (最小, 最大)（起動時の表になければconfigから取得）"""
+    delta_range = _DELTA_LIMITS.get(target)
+    return delta_range if delta_range is not None else config.get_delta_range(target)
 
-@app.post("/test/instruction")
+@app.post("/test/instruction", response_class=ORJSONResponse, include_in_schema=False)
 async def test_instruction(instruction: str):
     """指示解析のテストエンドポイント"""
     try:
         # 解析実行
-        operations = instruction_parser.parse_instruction(instruction)
+        operations = _parse_cached(instruction)
+        
+        # 各操作の詳細（操作順のリスト。範囲判定は起動時の表を引いてその場で比較）
+        operations_detail = []
+        for op in operations:
+            delta_mm = op["delta_mm"]
+            min_delta, max_delta = _delta_range(op["target"])
+            operations_detail.append({
+                "target": op["target"],
+                "delta_mm": delta_mm,
+                "action_type": op["action_type"],
+                "radius_mm": op.get("radius_mm", 12.0),
+                "sigma_mm": op.get("sigma_mm", 8.0),
+                "max_delta": max_delta,
+                "min_delta": min_delta,
+                "is_valid_range": min_delta <= delta_mm <= max_delta
+            })
         
         # 詳細な解析結果
         result = {
             "input": instruction,
             "operations": operations,
             "operation_count": len(operations),
-            "valid": len(operations) > 0
+            "valid": len(operations) > 0,
+            "operations_detail": operations_detail
         }
         
-        # 各操作の詳細
-        for i, op in enumerate(operations):
-            target = op["target"]
-            result[f"operation_{i}"] = {
-                "target": target,
-                "delta_mm": op["delta_mm"],
-                "action_type": op["action_type"],
-                "radius_mm": op.get("radius_mm", 12.0),
-                "sigma_mm": op.get("sigma_mm", 8.0),
-                "max_delta": config.get_max_delta(target),
-                "min_delta": config.get_min_delta(target),
-                "is_valid_range": config.validate_delta(target, op["delta_mm"])
-            }
-        
-        return JSONResponse(result)
+        # dictを返すとjsonable_encoderで全体を走査し直すため、Responseを直接返す
+        return ORJSONResponse(result)
         
     except Exception as e:
-        logger.error(f"Error testing instruction: {str(e)}")
+        logger.error("Error testing instruction: %s", e)
         raise HTTPException(status_code=500, detail=f"Test failed: {str(e)}")
 
 if __name__ == "__main__":
     api_config = config.get_api_config()
+    # ホットリロードはapi.reloadがtrueの時のみ（監視スレッドとスーパーバイザを起動しない）
+    reload = bool(api_config.get("reload", False))
+    # api.workersが0以下なら自動（CPU数-1）。リロード時はuvicornが単一プロセスで動く
+    workers = int(api_config.get("workers", 0) or 0)
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) - 1)
     uvicorn.run(
         "test_server:app", 
         host=api_config.get("host", "0.0.0.0"), 
         port=api_config.get("port", 8000), 
-        reload=True
+        # Cython実装のイベントループ/HTTPパーサーを明示（uvicorn[standard]に同梱）
+        loop="uvloop",
+        http="httptools",
+        reload=reload,
+        workers=1 if reload else workers
     )